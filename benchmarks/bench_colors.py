@@ -0,0 +1,74 @@
+"""Micro-benchmark do colors.py contra as implementações antigas de /info e /enviar.
+
+Uso: python benchmarks/bench_colors.py [tamanho_da_imagem] [repetições]
+"""
+import sys
+import timeit
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from colors import extract_color  # noqa: E402
+
+
+def legacy_basic(data: bytes):
+    """Basic.get_dominant_color antigo: loop em Python sobre getdata()"""
+    image = Image.open(BytesIO(data)).convert('RGBA')
+    image.thumbnail((100, 100))
+    colors = []
+    for pixel in image.getdata():
+        if pixel[3] > 0:
+            colors.append(pixel[:3])
+    if not colors:
+        return None
+    r = sum(color[0] for color in colors) // len(colors)
+    g = sum(color[1] for color in colors) // len(colors)
+    b = sum(color[2] for color in colors) // len(colors)
+    return r, g, b
+
+
+def legacy_message(data: bytes):
+    """Message.get_dominant_color antigo: resize + sort de getcolors()"""
+    image = Image.open(BytesIO(data))
+    if image.mode == 'RGBA':
+        image = image.convert('RGB')
+    image = image.resize((100, 100))
+    pixels = image.getcolors(10000)
+    return sorted(pixels, key=lambda t: t[0], reverse=True)[0][1]
+
+
+def make_image(size: int, fmt: str) -> bytes:
+    rng = np.random.default_rng(42)
+    pixels = rng.integers(0, 256, (size, size, 4), dtype=np.uint8)
+    pixels[: size // 4, :, 3] = 0  # uma faixa transparente pro mask
+    image = Image.fromarray(pixels, 'RGBA')
+    if fmt == 'JPEG':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    number = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    for fmt in ('PNG', 'JPEG'):
+        data = make_image(size, fmt)
+        cases = {
+            'legacy /info (average)': lambda: legacy_basic(data),
+            'colors average': lambda: extract_color(data, 'average'),
+            'legacy /enviar (getcolors)': lambda: legacy_message(data),
+            'colors dominant': lambda: extract_color(data, 'dominant'),
+        }
+        print(f"{fmt} {size}x{size} ({len(data) / 1024:.0f} KB), {number} repetições")
+        for name, func in cases.items():
+            seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+            print(f"  {name:<28} {seconds * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from storage import write_json_atomic
+
+# Sentinela pra diferenciar "não está no cache" de um valor None guardado
+MISSING = object()
+
+
+class LRUCache:
+    """Cache em memória com expiração por TTL e remoção LRU.
+
+    Cada entrada pode ter seu próprio TTL (útil pra guardar resultados
+    negativos por menos tempo). Se `path` for informado o cache pode ser salvo
+    e recarregado do disco, então as chaves precisam ser strings e os valores
+    serializáveis em JSON.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None, path: Optional[Path] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._save_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def load(self):
+        """Carrega as entradas salvas no disco, ignorando as que já expiraram"""
+        if not self.path or not self.path.exists():
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Error loading cache {self.path.name}: {e}")
+            return
+
+        now = time.time()
+        for key, expires_at, value in entries[-self.maxsize:]:
+            if expires_at is None or expires_at > now:
+                self._data[key] = (expires_at, value)
+
+    def save(self):
+        """Grava o cache no disco de forma atômica (arquivo temporário + replace)"""
+        if self.path:
+            self._write(self._snapshot())
+
+    async def save_async(self):
+        """Mesmo que save(), mas a escrita roda fora do event loop"""
+        if self.path:
+            # A cópia é feita aqui no loop pra não iterar o dict em outra thread
+            async with self._save_lock:
+                await asyncio.to_thread(self._write, self._snapshot())
+
+    def _snapshot(self) -> list:
+        return [[key, expires_at, value] for key, (expires_at, value) in self._data.items()]
+
+    def _write(self, entries: list):
+        try:
+            write_json_atomic(self.path, entries, ensure_ascii=False)
+        except OSError as e:
+            print(f"Error saving cache {self.path.name}: {e}")
+
+
+class SingleFlight:
+    """Junta chamadas concorrentes com a mesma chave numa única execução.
+
+    Enquanto uma busca está em andamento, quem pedir a mesma chave espera o
+    mesmo resultado em vez de disparar outra requisição.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield: se um dos chamadores for cancelado os outros continuam esperando
+        return await asyncio.shield(task)
@@ -0,0 +1,177 @@
+import ast
+import asyncio
+import importlib
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from discord.ext import commands
+
+
+def current_rss_mb():
+    """Memória residente atual do processo em MB (None se não der pra medir)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+@dataclass
+class CogReport:
+    name: str
+    ok: bool = False
+    error: Optional[str] = None
+    deps_ms: float = 0.0  # imports de topo do cog (libs)
+    import_ms: float = 0.0  # o módulo do cog em si
+    load_ms: float = 0.0
+    rss_mb: Optional[float] = None
+
+    def __str__(self) -> str:
+        if not self.ok:
+            return f"✗ {self.name}: {self.error}"
+        details = f"load {self.load_ms:.0f}ms, import {self.import_ms:.0f}ms, libs {self.deps_ms:.0f}ms"
+        if self.rss_mb is not None:
+            details += f", +{self.rss_mb:.1f}MB RSS"
+        return f"✓ {self.name} ({details})"
+
+
+class CogLoader:
+    """Carrega os cogs da pasta em paralelo respeitando dependências.
+
+    Um cog declara dependências com uma constante no topo do módulo, por
+    exemplo `DEPENDS = ('message_counter',)`. Ela é lida via AST, sem
+    executar o módulo. Cogs independentes carregam juntos; antes disso os
+    imports de topo de cada cog e depois o próprio módulo são importados em
+    threads, pra que libs pesadas não travem o event loop (o load_extension
+    executa o módulo de novo, mas aí só o corpo dele). Com `parallel=False`
+    carrega um por vez e mede o RSS de cada cog isoladamente.
+    """
+
+    def __init__(
+        self,
+        bot: commands.Bot,
+        folder: str = 'cogs',
+        enabled: Optional[Iterable[str]] = None,
+        disabled: Optional[Iterable[str]] = None,
+        parallel: bool = True
+    ):
+        self.bot = bot
+        self.folder = Path(folder)
+        self.package = self.folder.name
+        self.enabled = set(enabled) if enabled else None
+        self.disabled = set(disabled or ())
+        self.parallel = parallel
+        self.reports: Dict[str, CogReport] = {}
+        self._imports: Dict[str, Set[str]] = {}
+
+    def discover(self) -> Dict[str, Set[str]]:
+        """Acha os cogs habilitados e lê as dependências de cada um"""
+        depends = {}
+        for path in sorted(self.folder.glob('*.py')):
+            name = path.stem
+            if name.startswith('__'):
+                continue
+            if self.enabled is not None and name not in self.enabled:
+                continue
+            if name in self.disabled:
+                continue
+
+            try:
+                tree = ast.parse(path.read_text(encoding='utf-8'))
+            except (SyntaxError, OSError) as e:
+                self.reports[name] = CogReport(name, error=str(e))
+                continue
+
+            depends[name] = set()
+            self._imports[name] = set()
+            for node in tree.body:
+                if isinstance(node, ast.Assign) and any(
+                    isinstance(target, ast.Name) and target.id == 'DEPENDS' for target in node.targets
+                ):
+                    depends[name] = set(ast.literal_eval(node.value))
+                elif isinstance(node, ast.Import):
+                    self._imports[name].update(alias.name for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    self._imports[name].add(node.module)
+        return depends
+
+    def plan(self, depends: Dict[str, Set[str]]) -> List[List[str]]:
+        """Agrupa os cogs em níveis: cada nível só depende dos anteriores"""
+        pending = dict(depends)
+        levels = []
+        done: Set[str] = set()
+
+        while pending:
+            level = sorted(name for name, deps in pending.items() if deps <= done)
+            if not level:
+                # Sobrou dependência inexistente, desabilitada ou circular
+                for name, deps in pending.items():
+                    missing = ', '.join(sorted(deps - done))
+                    self.reports[name] = CogReport(name, error=f"dependência não resolvida: {missing}")
+                break
+            levels.append(level)
+            done.update(level)
+            for name in level:
+                del pending[name]
+        return levels
+
+    async def _import(self, module: str) -> float:
+        """Importa numa thread; devolve quanto levou em ms"""
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(importlib.import_module, module)
+        except Exception:
+            # O erro de verdade aparece no load_extension
+            pass
+        return (time.perf_counter() - started) * 1000
+
+    async def _prewarm(self, name: str, report: CogReport):
+        """Importa numa thread as libs de topo do cog que ainda não estão
+        carregadas e depois o próprio módulo, medindo as duas coisas"""
+        for module in sorted(self._imports.get(name, ())):
+            if module not in sys.modules:
+                report.deps_ms += await self._import(module)
+        report.import_ms = await self._import(f'{self.package}.{name}')
+
+    async def _load(self, name: str, depends: Set[str]) -> CogReport:
+        report = CogReport(name)
+        failed = [dep for dep in depends if not self.reports[dep].ok]
+        if failed:
+            report.error = f"dependência falhou: {', '.join(sorted(failed))}"
+            return report
+
+        rss_before = None if self.parallel else current_rss_mb()
+        started = time.perf_counter()
+        try:
+            await self._prewarm(name, report)
+            await self.bot.load_extension(f'{self.package}.{name}')
+            report.ok = True
+        except Exception as e:
+            report.error = str(e)
+        report.load_ms = (time.perf_counter() - started) * 1000
+
+        rss_after = None if self.parallel else current_rss_mb()
+        if rss_before is not None and rss_after is not None:
+            report.rss_mb = rss_after - rss_before
+        return report
+
+    async def load_all(self) -> List[CogReport]:
+        depends = self.discover()
+        for level in self.plan(depends):
+            if self.parallel:
+                results = await asyncio.gather(*(self._load(name, depends[name]) for name in level))
+            else:
+                results = [await self._load(name, depends[name]) for name in level]
+            for report in results:
+                self.reports[report.name] = report
+        return list(self.reports.values())
@@ -1,11 +1,8 @@
 import discord
+import asyncio
 from discord import app_commands
 from discord.ext import commands
 from guild_config import MY_GUILD
-from PIL import Image
-import io
-import aiohttp
-import colorsys
 
 class Basic(commands.Cog):
     """Comandos básicos do bot."""
@@ -14,39 +11,54 @@ class Basic(commands.Cog):
         """Inicializa o cog Basic."""
         self.bot = bot
 
-    async def get_dominant_color(self, avatar_url):
+    async def get_dominant_color(self, avatar: discord.Asset):
         """
         Obtém a cor dominante de uma imagem de avatar.
         
         Args:
-            avatar_url: URL do avatar do usuário
+            avatar: Asset do avatar do usuário
         Returns:
             discord.Color: Cor dominante do avatar
         """
-        async with aiohttp.ClientSession() as session:
-            async with session.get(str(avatar_url)) as response:
-                avatar_bytes = await response.read()
+        # PNG estático 128px: avatar animado vem só com o primeiro frame,
+        # bem menor que o GIF inteiro
+        static = avatar.with_format('png').with_size(128)
 
-        # Processar a imagem para encontrar a cor dominante
-        image = Image.open(io.BytesIO(avatar_bytes)).convert('RGBA')
-        # Redimensionar para processamento mais rápido
-        image.thumbnail((100, 100))
-        
-        # Coletar todas as cores não transparentes
-        colors = []
-        for pixel in image.getdata():
-            if pixel[3] > 0:  # Se não for transparente
-                colors.append(pixel[:3])
-        
-        if not colors:
+        async def download():
+            data, _ = await self.bot.http_client.fetch_image(str(static.url))
+            return data
+
+        # Média das cores não transparentes; o hash do avatar é a chave do cache
+        color = await self.bot.color_cache.get_or_compute(
+            self.bot.color_cache.avatar_key(avatar),
+            download,
+            mode='average'
+        )
+        if color is None:
             return discord.Color.default()
+        return discord.Color.from_rgb(*color)
 
-        # Calcular a cor média
-        r = sum(color[0] for color in colors) // len(colors)
-        g = sum(color[1] for color in colors) // len(colors)
-        b = sum(color[2] for color in colors) // len(colors)
+    async def resolve_member(self, guild: discord.Guild, member_id: int, refresh: bool = False):
+        """
+        Busca o membro no cache do gateway, indo na API só se precisar.
+        
+        O cache é considerado atualizado quando o bot tem o intent de membros
+        e o servidor já foi carregado por completo (chunked), porque aí o
+        gateway mantém cada membro em dia. Fora disso, ou com `refresh`, usa
+        fetch_member.
         
-        return discord.Color.from_rgb(r, g, b)
+        Args:
+            guild: Servidor onde procurar
+            member_id: ID do membro
+            refresh: Força a busca na API
+        Returns:
+            discord.Member: Membro encontrado
+        """
+        if not refresh and self.bot.intents.members and guild.chunked:
+            member = guild.get_member(member_id)
+            if member is not None:
+                return member
+        return await guild.fetch_member(member_id)
 
     @app_commands.guilds(MY_GUILD)
     @app_commands.command(
@@ -54,12 +66,14 @@ class Basic(commands.Cog):
         description="Mostra informações de conta de um usuário"
     )
     @app_commands.describe(
-        usuario="Marque o usuario para ver as informações dele"
+        usuario="Marque o usuario para ver as informações dele",
+        atualizar="Buscar os dados direto na API em vez do cache"
     )
     async def info(
         self, 
         interaction: discord.Interaction, 
-        usuario: discord.Member = None
+        usuario: discord.Member = None,
+        atualizar: bool = False
     ):
         """
         Exibe informações detalhadas sobre um usuário.
@@ -67,22 +81,28 @@ class Basic(commands.Cog):
         Args:
             interaction: Interação do Discord
             usuario: Membro do servidor a ser consultado (opcional)
+            atualizar: Ignora o cache de membros e consulta a API
         """
-        # Atualizar o membro para ter as informações mais recentes
         usuario = usuario or interaction.user
-        try:
-            usuario = await interaction.guild.fetch_member(usuario.id)
-        except discord.NotFound:
+        # Cor do avatar junto com o fetch_member: o avatar do membro que veio
+        # na interação já serve, não precisa esperar a API
+        usuario, color = await asyncio.gather(
+            self.resolve_member(interaction.guild, usuario.id, refresh=atualizar),
+            self.get_dominant_color(usuario.display_avatar),
+            return_exceptions=True
+        )
+        if isinstance(usuario, discord.NotFound):
             await interaction.response.send_message("Usuário não encontrado!", ephemeral=True)
             return
-        
-        # Pegar a cor dominante do avatar
-        embed_color = await self.get_dominant_color(usuario.display_avatar.url)
+        if isinstance(usuario, BaseException):
+            raise usuario
+        if isinstance(color, Exception):
+            color = discord.Color.default()
         
         embed = discord.Embed(
             title=f"Informações do Usuário",
             description=f"**{usuario.name}**",
-            color=embed_color
+            color=color
         )
         
         # Avatar grande e bonito
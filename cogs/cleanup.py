@@ -2,9 +2,257 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from guild_config import MY_GUILD
+import asyncio
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set
+
+LINK_RE = re.compile(r'https?://\S', re.IGNORECASE)
+SNOWFLAKE_RE = re.compile(r'\d{15,20}')
+RELATIVE_RE = re.compile(r'(\d+)\s*([mhd])', re.IGNORECASE)
+RELATIVE_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+MAX_REGEX_LENGTH = 200
+
+def parse_authors(text: Optional[str]) -> Set[int]:
+    """IDs de autores a partir de menções (<@123>) ou IDs soltos"""
+    return {int(user_id) for user_id in SNOWFLAKE_RE.findall(text or '')}
+
+def is_catastrophic(pattern: str) -> bool:
+    """Grupo repetido (*, + ou {}) com quantificador ou alternância dentro,
+    tipo (a+)+, (a|aa)+ ou (a?)*: o backtracking explode e trava o event loop.
+
+    Recusa mais do que precisa (ex.: (ab|cd)+), o que é ok pra um filtro.
+    """
+    text = re.sub(r'\\.', '', pattern)  # escapados são literais
+    text = re.sub(r'\[\^?\]?[^\]]*\]', '', text)  # classes [...] também
+    outer = []  # pra cada grupo aberto: o nível de fora já tinha quantificador?
+    risky = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '(':
+            outer.append(risky)
+            risky = False
+            if text[i + 1:i + 2] == '?':
+                i += 1  # (?: (?= (?P<...> não é quantificador
+        elif char == ')' and outer:
+            if risky and text[i + 1:i + 2] in ('*', '+', '{'):
+                return True
+            risky = outer.pop() or risky
+        elif char in '*+?{|':
+            risky = True
+        i += 1
+    return False
+
+def parse_bound(text: str, high: bool = False) -> int:
+    """Converte ID/link de mensagem, hora (dd/mm/aaaa [hh:mm]) ou tempo
+    relativo (30m, 2h, 7d) num snowflake pra usar de limite no histórico.
+
+    `high` pega o maior snowflake daquele instante (pro limite "depois").
+    """
+    text = text.strip()
+    # ID ou link de mensagem (o ID é o último número do link)
+    match = re.fullmatch(r'(?:https?://\S+/)?(\d{15,20})', text)
+    if match:
+        return int(match[1])
+
+    match = RELATIVE_RE.fullmatch(text)
+    if match:
+        moment = discord.utils.utcnow() - timedelta(**{RELATIVE_UNITS[match[2].lower()]: int(match[1])})
+        return discord.utils.time_snowflake(moment, high=high)
+
+    for fmt in ('%d/%m/%Y %H:%M', '%d/%m/%Y'):
+        try:
+            # Sem fuso: hora local da máquina do bot
+            moment = datetime.strptime(text, fmt).astimezone()
+            return discord.utils.time_snowflake(moment, high=high)
+        except ValueError:
+            pass
+
+    raise ValueError(f"Não entendi `{text}`: use ID/link de mensagem, dd/mm/aaaa hh:mm ou tipo 30m, 2h, 7d.")
+
+@dataclass
+class MessageFilter:
+    """Filtros do /limpar; `compile` monta uma função só pra testar cada mensagem"""
+    authors: Set[int] = field(default_factory=set)
+    contains: Optional[str] = None
+    pattern: Optional[re.Pattern] = None
+    has_attachment: bool = False
+    has_link: bool = False
+    bots_only: bool = False
+    before: Optional[int] = None  # snowflakes; aplicados na busca do histórico
+    after: Optional[int] = None
+
+    def compile(self) -> Callable[[discord.Message], bool]:
+        # Do teste mais barato pro mais caro, pra all() parar cedo
+        checks = []
+        if self.authors:
+            authors = frozenset(self.authors)
+            checks.append(lambda m: m.author.id in authors)
+        if self.bots_only:
+            checks.append(lambda m: m.author.bot)
+        if self.has_attachment:
+            checks.append(lambda m: bool(m.attachments))
+        if self.contains:
+            needle = self.contains.casefold()
+            checks.append(lambda m: needle in m.content.casefold())
+        if self.has_link:
+            checks.append(lambda m: LINK_RE.search(m.content) is not None)
+        if self.pattern:
+            search = self.pattern.search
+            checks.append(lambda m: search(m.content) is not None)
+
+        if not checks:
+            return lambda m: True  # Permite apagar todas as mensagens se tiver permissão
+        if len(checks) == 1:
+            return checks[0]
+        return lambda m: all(check(m) for check in checks)
+
+class CleanupJob:
+    """Limpeza grande: varre o histórico em páginas e apaga em duas filas.
+
+    Mensagens com menos de 14 dias vão em lotes de até 100 pro bulk delete,
+    uma chamada por lote. As mais antigas o Discord não aceita no bulk, então
+    vão uma a uma numa task separada; o discord.py segura o ritmo pelos
+    headers de rate limit (e espera nos 429), e como bulk e delete individual
+    são buckets diferentes as duas filas andam ao mesmo tempo.
+    """
+
+    BULK_SIZE = 100
+    # Folga pro relógio: perto dos 14 dias o bulk delete recusa o lote inteiro
+    BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+
+    def __init__(
+        self,
+        channel: discord.abc.Messageable,
+        limit: int,
+        check: Callable[[discord.Message], bool],
+        reason: Optional[str] = None,
+        max_scan: Optional[int] = None,
+        before: Optional[int] = None,
+        after: Optional[int] = None
+    ):
+        self.channel = channel
+        self.limit = limit
+        self.check = check
+        self.reason = reason
+        self.max_scan = max_scan
+        self.before = before
+        self.after = after
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.failed = 0
+        self.cancelled = False
+        self.error: Optional[Exception] = None
+        # Limitada pra varredura não correr muito na frente da fila lenta
+        self.old_queue: asyncio.Queue = asyncio.Queue(maxsize=self.BULK_SIZE)
+
+    def cancel(self):
+        self.cancelled = True
+
+    async def run(self):
+        cutoff = discord.utils.utcnow() - self.BULK_MAX_AGE
+        single_lane = asyncio.create_task(self._single_lane())
+        batch: List[discord.Message] = []
+        try:
+            # history busca de 100 em 100, da mais nova pra mais antiga, já
+            # começando no `before`. O `after` é checado aqui em vez de ir pro
+            # history: a varredura para na primeira mensagem que cruza ele e
+            # `scanned` conta só o que foi visto de fato dentro do intervalo
+            history = self.channel.history(
+                limit=self.max_scan,
+                before=discord.Object(id=self.before) if self.before else None,
+                oldest_first=False
+            )
+            async for message in history:
+                if self.cancelled or (self.after and message.id <= self.after):
+                    break
+                self.scanned += 1
+                if not self.check(message):
+                    continue
+
+                self.matched += 1
+                if message.created_at > cutoff:
+                    batch.append(message)
+                    if len(batch) == self.BULK_SIZE:
+                        await self._bulk_delete(batch)
+                        batch = []
+                else:
+                    await self.old_queue.put(message)
+
+                if self.matched >= self.limit:
+                    break
+
+            if batch and not self.cancelled:
+                await self._bulk_delete(batch)
+            if not self.cancelled:
+                await self.old_queue.put(None)  # fim da fila
+                await single_lane
+        finally:
+            if not single_lane.done():
+                single_lane.cancel()
+                await asyncio.gather(single_lane, return_exceptions=True)
+
+        if self.error:
+            raise self.error
+
+    async def _bulk_delete(self, batch: List[discord.Message]):
+        try:
+            await self.channel.delete_messages(batch, reason=self.reason)
+            self.deleted += len(batch)
+        except discord.Forbidden:
+            raise
+        except discord.HTTPException:
+            self.failed += len(batch)
+
+    async def _single_lane(self):
+        while True:
+            message = await self.old_queue.get()
+            if message is None:
+                return
+            if self.cancelled:
+                continue  # só esvazia a fila pra varredura não travar no put
+
+            try:
+                await message.delete()
+                self.deleted += 1
+            except discord.NotFound:
+                pass  # alguém já apagou
+            except discord.Forbidden as e:
+                self.error = e
+                self.cancel()
+            except discord.HTTPException:
+                self.failed += 1
+            except Exception as e:
+                # Erro de rede depois das retentativas do discord.py, timeout...
+                # Sem isso a task morria e a varredura travava no put da fila cheia
+                self.error = e
+                self.cancel()
+
+class CancelView(discord.ui.View):
+    def __init__(self, job: CleanupJob, command_user: discord.abc.User):
+        super().__init__(timeout=None)
+        self.job = job
+        self.command_user = command_user
+
+    @discord.ui.button(label="Parar", style=discord.ButtonStyle.danger)
+    async def stop_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.command_user.id:
+            await interaction.response.send_message("Só quem usou o comando pode parar!", ephemeral=True)
+            return
+
+        self.job.cancel()
+        button.disabled = True
+        await interaction.response.edit_message(view=self)
 
 class Cleanup(commands.Cog):
     """Cog responsável por gerenciar a limpeza de mensagens no chat"""
+
+    MAX_QUANTIDADE = 5000
+    MAX_SCAN = 20000  # mensagens vistas no máximo, pra filtros que quase não batem
+    PROGRESS_INTERVAL = 2  # segundos entre edições da mensagem de progresso
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -15,18 +263,34 @@ class Cleanup(commands.Cog):
         description="Limpa mensagens do chat"
     )
     @app_commands.describe(
-        quantidade="Número de mensagens para apagar (1-100)",
-        usuario="Apagar mensagens apenas deste usuário"
+        quantidade="Número de mensagens para apagar (1-5000)",
+        usuario="Apagar mensagens apenas deste usuário",
+        autores="Vários autores: menções ou IDs",
+        contem="Só mensagens com esse texto (sem diferenciar maiúsculas)",
+        regex="Só mensagens que batem com essa regex (só cargo *)",
+        com_anexo="Só mensagens com anexo",
+        com_link="Só mensagens com link",
+        apenas_bots="Só mensagens de bots",
+        antes="Antes desta mensagem (ID/link) ou hora (dd/mm/aaaa hh:mm, 2h, 7d)",
+        depois="Depois desta mensagem (ID/link) ou hora (dd/mm/aaaa hh:mm, 2h, 7d)"
     )
     async def limpar(
         self,
         interaction: discord.Interaction,
         quantidade: int,
-        usuario: discord.Member = None
+        usuario: discord.Member = None,
+        autores: str = None,
+        contem: str = None,
+        regex: str = None,
+        com_anexo: bool = False,
+        com_link: bool = False,
+        apenas_bots: bool = False,
+        antes: str = None,
+        depois: str = None
     ):
-        if not 1 <= quantidade <= 100:
+        if not 1 <= quantidade <= self.MAX_QUANTIDADE:
             await interaction.response.send_message(
-                "A quantidade deve ser entre 1 e 100 mensagens.",
+                f"A quantidade deve ser entre 1 e {self.MAX_QUANTIDADE} mensagens.",
                 ephemeral=True
             )
             return
@@ -34,36 +298,81 @@ class Cleanup(commands.Cog):
         # Check if user has '*' role
         has_admin = any(role.name == '*' for role in interaction.user.roles)
         
+        authors = parse_authors(autores)
+        if usuario:
+            authors.add(usuario.id)
+
         # If user doesn't have '*' role, they can only delete their own messages
         if not has_admin:
-            if usuario and usuario.id != interaction.user.id:
+            if authors - {interaction.user.id}:
                 await interaction.response.send_message(
                     "Você só pode apagar suas próprias mensagens!",
                     ephemeral=True
                 )
                 return
             usuario = interaction.user
+            authors = {interaction.user.id}
+
+        # Regex roda no event loop pra cada mensagem: só quem tem o cargo
+        if regex and not has_admin:
+            await interaction.response.send_message(
+                "Filtro por regex é só pra quem tem o cargo *.",
+                ephemeral=True
+            )
+            return
+
+        # Monta os filtros uma vez só; erro de digitação volta antes de apagar nada
+        try:
+            if regex and len(regex) > MAX_REGEX_LENGTH:
+                raise ValueError(f"Regex muito grande (máximo {MAX_REGEX_LENGTH} caracteres).")
+            if regex and is_catastrophic(regex):
+                raise ValueError("Regex com grupo repetido que tem quantificador ou `|` dentro (tipo `(a+)+`, `(a|aa)+`) não rola.")
+            try:
+                pattern = re.compile(regex) if regex else None
+            except re.error as e:
+                raise ValueError(f"Regex inválida: {e}")
+
+            message_filter = MessageFilter(
+                authors=authors,
+                contains=contem,
+                pattern=pattern,
+                has_attachment=com_anexo,
+                has_link=com_link,
+                bots_only=apenas_bots,
+                before=parse_bound(antes) if antes else None,
+                after=parse_bound(depois, high=True) if depois else None
+            )
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+
+        if message_filter.before and message_filter.after and message_filter.before <= message_filter.after:
+            await interaction.response.send_message("O `antes` tem que ser depois do `depois`.", ephemeral=True)
+            return
 
         # Responder primeiro para não causar erro
         await interaction.response.defer(ephemeral=True)
 
-        # Função para filtrar mensagens
-        def check_message(message):
-            if usuario:
-                return message.author.id == usuario.id
-            return True  # Permite apagar todas as mensagens se tiver permissão
-
         # Apagar mensagens
+        job = CleanupJob(
+            interaction.channel,
+            limit=quantidade,
+            check=message_filter.compile(),
+            reason=f"{interaction.user} limpou o chat",
+            max_scan=self.MAX_SCAN,
+            before=message_filter.before,
+            after=message_filter.after
+        )
         try:
-            deleted = await interaction.channel.purge(
-                limit=quantidade,
-                check=check_message,
-                reason=f"{interaction.user} limpou o chat"
-            )
+            await self.run_job(interaction, job)
             
-            msg = f"Apagadas {len(deleted)} mensagens"
+            msg = f"Apagadas {job.deleted} mensagens"
             if usuario and usuario != interaction.user:
                 msg += f" de {usuario.name}"
+            if job.failed:
+                msg += f" ({job.failed} falharam)"
+            if job.cancelled:
+                msg += " (parado antes de terminar)"
                 
             await interaction.followup.send(msg, ephemeral=False)
             
@@ -72,6 +381,40 @@ class Cleanup(commands.Cog):
         except Exception as e:
             await interaction.followup.send(f"Erro ao apagar mensagens: {str(e)}", ephemeral=True)
 
+    async def run_job(self, interaction: discord.Interaction, job: CleanupJob):
+        """Roda a limpeza mostrando o progresso, com botão pra parar"""
+        view = CancelView(job, interaction.user)
+        task = asyncio.create_task(job.run())
+        status = None
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=self.PROGRESS_INTERVAL)
+                if task.done():
+                    break
+
+                new_status = f"Apagando... {job.deleted}/{job.limit} apagadas, {job.scanned} mensagens vistas"
+                if job.old_queue.qsize():
+                    new_status += f", {job.old_queue.qsize()} antigas na fila"
+                if new_status != status:
+                    status = new_status
+                    try:
+                        await interaction.edit_original_response(content=status, view=view)
+                    except discord.HTTPException:
+                        pass  # token expirou (15 min); a limpeza continua
+        except asyncio.CancelledError:
+            job.cancel()
+            task.cancel()
+            raise
+        finally:
+            view.stop()
+            if status is not None:
+                try:
+                    await interaction.edit_original_response(content="Limpeza terminada.", view=None)
+                except discord.HTTPException:
+                    pass
+
+        await task
+
     @limpar.error
     async def limpar_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         if isinstance(error, app_commands.MissingPermissions):
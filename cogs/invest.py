@@ -1,20 +1,24 @@
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-import aiohttp
+import asyncio
 import json
-from datetime import datetime, timedelta
-import pandas as pd
-import numpy as np
+import os
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 from guild_config import MY_GUILD
+from timeseries import KlineCache, PriceStore
 
 class Investment(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.UPDATE_CHANNEL_ID = 1301273876558512253
         self.data_path = Path(__file__).parent.parent / 'data' / 'crypto_prices.json'
+        # Últimas 25 cotações de cada símbolo (máx. 24h), uma por minuto
+        self.price_store = PriceStore(self.data_path, capacity=25, retention=24 * 3600)
+        self.price_store.load()
         self.last_message = None  # Armazenar última mensagem
         
         # Binance API endpoints
@@ -27,6 +31,33 @@ class Investment(commands.Cog):
             'LTCUSDT': 'litecoin'  # Trocado de BNBUSDT para LTCUSDT
         }
         
+        # Watchlist configurável: CRYPTO_WATCHLIST=BTCUSDT,ETHUSDT,SOLUSDT,...
+        watchlist = os.getenv('CRYPTO_WATCHLIST')
+        if watchlist:
+            symbols = [s.strip().upper() for s in watchlist.split(',') if s.strip()]
+            self.CRYPTO_SYMBOLS = {
+                symbol: self.CRYPTO_SYMBOLS.get(symbol, symbol.removesuffix('USDT').lower())
+                for symbol in symbols
+            }
+        
+        self.CRYPTO_EMOJIS = {
+            'BTCUSDT': '₿',
+            'ETHUSDT': 'Ξ',
+            'LTCUSDT': 'Ł'
+        }
+        
+        self.TICKER_BATCH_SIZE = 100  # max symbols per /ticker/24hr request
+        self.KLINE_CONCURRENCY = int(os.getenv('KLINE_CONCURRENCY', '5'))
+        self.KLINE_INTERVAL_MS = 3600 * 1000  # 1h candles
+        self.KLINE_MAX_LIMIT = 1000  # max candles per /klines request
+        
+        # 30 days of hourly candles per symbol, updated incrementally
+        self.kline_cache = KlineCache(
+            Path(__file__).parent.parent / 'data' / 'klines_cache.json',
+            max_candles=24 * 30
+        )
+        self.kline_cache.load()
+        
         # cores para cada cripto
         self.CRYPTO_COLORS = {
             'BTCUSDT': 0xF7931A,    # laranja bitcoin
@@ -42,177 +73,167 @@ class Investment(commands.Cog):
     def cog_unload(self):
         self.price_update_loop.cancel()
 
-    def ensure_data_file(self):
-        """Create data file if it doesn't exist"""
-        try:
-            self.data_path.parent.mkdir(exist_ok=True)
-            if not self.data_path.exists():
-                # Initialize with empty prices list
-                with open(self.data_path, 'w') as f:
-                    json.dump({"prices": []}, f, indent=2)
-            else:
-                # Validate existing file
-                try:
-                    with open(self.data_path, 'r') as f:
-                        data = json.load(f)
-                        if not isinstance(data, dict) or "prices" not in data:
-                            raise ValueError("Invalid data structure")
-                except (json.JSONDecodeError, ValueError):
-                    # If file is corrupt, recreate it
-                    with open(self.data_path, 'w') as f:
-                        json.dump({"prices": []}, f, indent=2)
-        except Exception as e:
-            print(f"Error ensuring data file: {e}")
+    async def fetch_tickers(self) -> Dict[str, Dict[str, float]]:
+        """Fetch 24h ticker stats for the tracked symbols only"""
+        url = f"{self.BINANCE_BASE_URL}/ticker/24hr"
+        symbols = list(self.CRYPTO_SYMBOLS)
+        batches = [
+            symbols[i:i + self.TICKER_BATCH_SIZE]
+            for i in range(0, len(symbols), self.TICKER_BATCH_SIZE)
+        ]
 
-    def load_price_data(self) -> List:
-        """Load price data from JSON file"""
-        try:
-            with open(self.data_path, 'r') as f:
-                data = json.load(f)
-                if not isinstance(data, dict) or "prices" not in data:
-                    return []
-                return data["prices"]
-        except json.JSONDecodeError:
-            print("Error: Invalid JSON in price data file")
-            return []
-        except Exception as e:
-            print(f"Error loading price data: {e}")
+        async def fetch_batch(batch: List[str]) -> List[Dict]:
+            # symbols=["BTCUSDT","ETHUSDT"] - Binance only returns these
+            params = {'symbols': json.dumps(batch, separators=(',', ':'))}
+            async with self.bot.http_client.get(url, params=params) as response:
+                if response.status == 200:
+                    return await response.json()
+                status, detail = response.status, await response.text()
+
+            if status == 400 and len(batch) > 1:
+                # Um símbolo que não existe (-1121) derruba o lote inteiro:
+                # tenta um por um pra achar o culpado e manter o resto
+                results = await asyncio.gather(*(fetch_batch([symbol]) for symbol in batch))
+                return [ticker for result in results for ticker in result]
+            if status == 400:
+                self.CRYPTO_SYMBOLS.pop(batch[0], None)
+                print(f"Simbolo invalido na CRYPTO_WATCHLIST, removido: {batch[0]} ({detail})")
+                return []
+            print(f"Error ao coletar os precos: HTTP {status}")
             return []
 
-    def store_price(self, symbol: str, price: float):
-        """Store price in JSON file with optimized storage"""
         try:
-            prices = self.load_price_data()
-            
-            # Create timestamp for current entry
-            current_time = datetime.now()
-            
-            # Filter existing prices to keep only last 24h
-            # and remove entries of same symbol within 1-minute window
-            valid_prices = []
-            cutoff = (current_time - timedelta(hours=24)).isoformat()
-            seen_timestamps = {}
-            
-            for p in prices:
-                # Skip if entry is older than 24h
-                if p["timestamp"] < cutoff:
-                    continue
-                    
-                # For each symbol, keep only one entry per minute
-                entry_time = datetime.fromisoformat(p["timestamp"])
-                minute_key = f"{p['symbol']}_{entry_time.strftime('%Y%m%d%H%M')}"
-                
-                if minute_key not in seen_timestamps:
-                    seen_timestamps[minute_key] = True
-                    valid_prices.append(p)
-            
-            # Add new price entry
-            new_price = {
-                "symbol": symbol,
-                "price": price,
-                "timestamp": current_time.isoformat()
-            }
-            
-            valid_prices.append(new_price)
-            valid_prices.sort(key=lambda x: x["timestamp"], reverse=True)
-            
-            # Keep only necessary entries
-            final_prices = []
-            entries_per_symbol = {}
-            
-            for p in valid_prices:
-                symbol = p["symbol"]
-                if symbol not in entries_per_symbol:
-                    entries_per_symbol[symbol] = 0
-                
-                if entries_per_symbol[symbol] < 25:
-                    final_prices.append(p)
-                    entries_per_symbol[symbol] += 1
-            
-            # Corrigido: usando "prices" em vez de "precos"
-            with open(self.data_path, 'w') as f:
-                json.dump({"prices": final_prices}, f, indent=2)
-                
+            results = await asyncio.gather(*(fetch_batch(batch) for batch in batches))
         except Exception as e:
-            print(f"erro ao salvar preço: {e}")
+            print(f"Error ao coletar os precos: {e}")
+            return {}
+
+        tickers = {}
+        for batch in results:
+            for ticker in batch:
+                tickers[ticker['symbol']] = {
+                    'price': float(ticker['lastPrice']),
+                    'high': float(ticker['highPrice']),
+                    'low': float(ticker['lowPrice']),
+                    'change': float(ticker['priceChangePercent'])
+                }
+        return tickers
 
     async def fetch_crypto_prices(self) -> Dict[str, float]:
         """Fetch current crypto prices from Binance public API"""
-        async with aiohttp.ClientSession() as session:
-            try:
-                # Using 24hr ticker endpoint - doesn't require API key
-                url = f"{self.BINANCE_BASE_URL}/ticker/24hr"
-                prices = {}
-                
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        all_tickers = await response.json()
-                        # Filter only our symbols
-                        for ticker in all_tickers:
-                            symbol = ticker['symbol']
-                            if symbol in self.CRYPTO_SYMBOLS:
-                                prices[symbol] = float(ticker['lastPrice'])
-                    return prices
-            except Exception as e:
-                print(f"Error ao coletar os precos: {e}")
-                return {}
+        tickers = await self.fetch_tickers()
+        return {symbol: ticker['price'] for symbol, ticker in tickers.items()}
 
-    async def fetch_historical_data(self, symbol: str, interval: str = '1h', limit: int = 24) -> List[Dict]:
-        """Fetch historical kline/candlestick data from Binance public API"""
-        async with aiohttp.ClientSession() as session:
-            try:
-                # Using public klines endpoint
-                url = f"{self.BINANCE_BASE_URL}/klines"
-                params = {
-                    'symbol': symbol,
-                    'interval': interval,
-                    'limit': limit
-                }
-                
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return [
-                            {
-                                'timestamp': datetime.fromtimestamp(k[0] / 1000),
-                                'price': float(k[4]),  # closing price
-                                'volume': float(k[5]), # volume
-                                'high': float(k[2]),   # high price
-                                'low': float(k[3])     # low price
-                            } for k in data
-                        ]
-                    return []
-            except Exception as e:
-                print(f"Error fetching historical data: {e}")
+    async def fetch_historical_data(self, symbol: str, interval: str = '1h', limit: int = 24, start_time: Optional[int] = None) -> List[list]:
+        """Fetch kline rows [open_time_ms, close, high, low, volume] from Binance public API"""
+        try:
+            # Using public klines endpoint
+            url = f"{self.BINANCE_BASE_URL}/klines"
+            params = {
+                'symbol': symbol,
+                'interval': interval,
+                'limit': limit
+            }
+            if start_time is not None:
+                params['startTime'] = start_time
+            
+            async with self.bot.http_client.get(url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return [
+                        [
+                            int(k[0]),     # open time
+                            float(k[4]),   # closing price
+                            float(k[2]),   # high price
+                            float(k[3]),   # low price
+                            float(k[5])    # volume
+                        ] for k in data
+                    ]
                 return []
+        except Exception as e:
+            print(f"Error fetching historical data: {e}")
+            return []
 
-    async def calculate_indicators(self, symbol: str) -> Dict:
-        """Calculate technical indicators using public data"""
-        try:
-            # Aguardar os dados históricos
-            historical_data = await self.fetch_historical_data(symbol)
-            if not historical_data:
-                return {}
+    async def update_klines(self, symbol: str):
+        """Bring the cached hourly candles up to date, fetching only the new ones"""
+        last_open = self.kline_cache.last_open_time(symbol)
+        now_ms = int(time.time() * 1000)
+        missing = (now_ms - last_open) // self.KLINE_INTERVAL_MS + 1 if last_open is not None else None
 
-            # Criar DataFrame apenas se houver dados
-            if len(historical_data) > 0:
-                df = pd.DataFrame(historical_data)
-                current_price = df['price'].iloc[-1]
-                hour_ago_price = df['price'].iloc[-2] if len(df) > 1 else current_price
-                day_ago_price = df['price'].iloc[0]
-                
-                indicators = {
-                    '1h_change': ((current_price - hour_ago_price) / hour_ago_price) * 100,
-                    '24h_change': ((current_price - day_ago_price) / day_ago_price) * 100,
-                    '24h_high': df['high'].max(),
-                    '24h_low': df['low'].min()
+        if missing is None or missing > self.KLINE_MAX_LIMIT:
+            # Empty cache or too far behind: refetch the whole window
+            rows = await self.fetch_historical_data(symbol, limit=self.kline_cache.max_candles)
+            if rows:
+                self.kline_cache.replace(symbol, rows)
+        else:
+            # startTime = last cached candle, since it was probably still open
+            rows = await self.fetch_historical_data(symbol, limit=missing, start_time=last_open)
+            self.kline_cache.merge(symbol, rows)
+
+    async def fetch_all_historical_data(self, symbols: List[str]) -> Dict[str, List[list]]:
+        """Update klines for every symbol concurrently, bounded by KLINE_CONCURRENCY"""
+        semaphore = asyncio.Semaphore(self.KLINE_CONCURRENCY)
+
+        async def update(symbol: str):
+            async with semaphore:
+                await self.update_klines(symbol)
+
+        await asyncio.gather(*(update(symbol) for symbol in symbols))
+        await self.kline_cache.flush()
+        return {symbol: self.kline_cache.window(symbol, self.kline_cache.max_candles) for symbol in symbols}
+
+    def compute_indicators(self, history: Dict[str, List[list]], tickers: Dict[str, Dict[str, float]]) -> Dict[str, Dict]:
+        """Compute indicators for all symbols in one vectorized pass"""
+        import numpy as np  # lazy: only needed once per tick, keeps cog load cheap
+
+        indicators = {}
+        symbols = [symbol for symbol, candles in history.items() if candles]
+
+        if symbols:
+            # One row per symbol, left-padded with NaN so the last column is the newest candle
+            width = max(len(history[symbol]) for symbol in symbols)
+            closes = np.full((len(symbols), width), np.nan)
+            highs = np.full((len(symbols), width), np.nan)
+            lows = np.full((len(symbols), width), np.nan)
+            lengths = np.empty(len(symbols), dtype=int)
+            for row, symbol in enumerate(symbols):
+                candles = history[symbol]
+                offset = width - len(candles)
+                closes[row, offset:] = [c[1] for c in candles]
+                highs[row, offset:] = [c[2] for c in candles]
+                lows[row, offset:] = [c[3] for c in candles]
+                lengths[row] = len(candles)
+
+            rows = np.arange(len(symbols))
+            current = closes[:, -1]
+
+            def change_over(hours: int):
+                # Close `hours` candles back; NaN when the cache doesn't go back
+                # that far (new pair, failed history fetch), so it isn't shown
+                reference = closes[rows, max(width - hours, 0)]
+                return np.where(lengths >= hours, (current - reference) / reference * 100, np.nan)
+
+            windows = {'1h': 2, '24h': 24, '7d': 24 * 7, '30d': 24 * 30}
+            changes = {name: change_over(hours) for name, hours in windows.items()}
+            high_24h = np.nanmax(highs[:, -24:], axis=1)
+            low_24h = np.nanmin(lows[:, -24:], axis=1)
+
+            for row, symbol in enumerate(symbols):
+                indicators[symbol] = {
+                    f'{name}_change': float(values[row])
+                    for name, values in changes.items() if not np.isnan(values[row])
                 }
-                return indicators
-            return {}
-            
-        except Exception as e:
-            print(f"erro ao calcular indicadores para {symbol}: {e}")
-            return {}
+                indicators[symbol]['24h_high'] = float(high_24h[row])
+                indicators[symbol]['24h_low'] = float(low_24h[row])
+
+        for symbol, ticker in tickers.items():
+            # The rolling 24h stats from the ticker are exact, use them directly
+            indicators.setdefault(symbol, {}).update({
+                '24h_change': ticker['change'],
+                '24h_high': ticker['high'],
+                '24h_low': ticker['low']
+            })
+        return indicators
 
     def create_price_embed(self, prices: Dict[str, float], indicators: Dict[str, Dict]) -> discord.Embed:
         """Cria um embed mais atraente com informações de preço"""
@@ -226,9 +247,13 @@ class Investment(commands.Cog):
         # Adicionar imagem em miniatura (thumbnail)
         embed.set_thumbnail(url='https://example.com/crypto_thumbnail.png')
         
+        shown = 0
         for symbol, name in self.CRYPTO_SYMBOLS.items():
             if symbol not in prices:
                 continue
+            if shown == 25:  # Discord embed field limit
+                break
+            shown += 1
                 
             current_price = prices[symbol]
             indicator_data = indicators.get(symbol, {})
@@ -236,11 +261,17 @@ class Investment(commands.Cog):
             change_24h = indicator_data.get('24h_change', 0)
             emoji = "📈" if change_24h > 0 else "📉"
             
-            crypto_emoji = "₿" if "BTC" in symbol else "Ξ" if "ETH" in symbol else "Ł"  # Trocado BNB para Ł (Litecoin)
+            crypto_emoji = self.CRYPTO_EMOJIS.get(symbol, "🪙")
             
             value = (
                 f"**Preço:** `${current_price:,.2f}` USD\n"
                 f"**Variação 24h:** `{change_24h:+.2f}%` {emoji}\n"
+            )
+            if '7d_change' in indicator_data:
+                value += f"**Variação 7d:** `{indicator_data['7d_change']:+.2f}%`\n"
+            if '30d_change' in indicator_data:
+                value += f"**Variação 30d:** `{indicator_data['30d_change']:+.2f}%`\n"
+            value += (
                 f"**Máxima 24h:** `${indicator_data.get('24h_high', 0):,.2f}`\n"
                 f"**Mínima 24h:** `${indicator_data.get('24h_low', 0):,.2f}`\n"
             )
@@ -263,14 +294,19 @@ class Investment(commands.Cog):
             if not channel:
                 return
 
-            prices = await self.fetch_crypto_prices()
-            if not prices:
+            tickers = await self.fetch_tickers()
+            if not tickers:
                 return
 
-            indicators = {}
+            prices = {symbol: ticker['price'] for symbol, ticker in tickers.items()}
             for symbol, price in prices.items():
-                self.store_price(symbol, price)
-                indicators[symbol] = await self.calculate_indicators(symbol)
+                self.price_store.add(symbol, price)
+
+            history = await self.fetch_all_historical_data(list(prices))
+            indicators = self.compute_indicators(history, tickers)
+
+            # Uma escrita só por tick pra todos os símbolos
+            await self.price_store.flush()
 
             embed = self.create_price_embed(prices, indicators)
             
@@ -2,47 +2,43 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from guild_config import MY_GUILD
+from http_client import ImageFetchError
+from typing import Optional
 import aiohttp
-from PIL import Image
-from io import BytesIO
+import asyncio
 
 class Message(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
     
-    async def is_valid_image_url(self, url: str) -> bool:
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.head(url) as response:
-                    if response.status == 200:
-                        content_type = response.headers.get('content-type', '')
-                        return 'image' in content_type or 'gif' in content_type
-            return False
-        except:
-            return False
+    async def get_image_color(self, url: str) -> Optional[discord.Color]:
+        """Baixa a imagem uma vez (com limite de tamanho) e devolve a cor dela.
+
+        Retorna None se a URL não for uma imagem válida; o download em
+        streaming já valida o formato, então não precisa de HEAD antes.
+        """
+        async def download():
+            data, _ = await self.bot.http_client.fetch_image(url)
+            return data
 
-    async def get_dominant_color(self, url: str) -> discord.Color:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.read()
-                        image = Image.open(BytesIO(data))
-                        # Convert to RGB if image is in RGBA mode
-                        if image.mode == 'RGBA':
-                            image = image.convert('RGB')
-                        # Resize image to speed up processing
-                        image = image.resize((100, 100))
-                        # Get colors from image
-                        pixels = image.getcolors(10000)
-                        # Sort by count and get the most common color
-                        sorted_pixels = sorted(pixels, key=lambda t: t[0], reverse=True)
-                        dominant_color = sorted_pixels[0][1]
-                        return discord.Color.from_rgb(*dominant_color)
-            return discord.Color.blue()
-        except:
+            # Cor mais frequente (histograma quantizado), cacheada por URL
+            color = await self.bot.color_cache.get_or_compute(
+                self.bot.color_cache.url_key(url),
+                download,
+                mode='dominant'
+            )
+        except (ImageFetchError, aiohttp.ClientError, asyncio.TimeoutError, ValueError, OSError):
+            # OSError inclui o UnidentifiedImageError do PIL: passou no
+            # sniff dos magic bytes mas não decodifica
+            return None
+        except Exception:
             return discord.Color.blue()
 
+        if color:
+            return discord.Color.from_rgb(*color)
+        return discord.Color.blue()
+
     @app_commands.guilds(MY_GUILD)
     @app_commands.command(
         name="enviar",
@@ -73,16 +69,16 @@ class Message(commands.Cog):
         # se botou os dois vai priorizar o upload
         image_url = imagem.url if imagem else url_imagem
 
-        # verifica se a url funciona
-        if not imagem and not await self.is_valid_image_url(url_imagem):
-            await interaction.response.send_message(
-                "TA ERRADO ISSO AI MERMAO",
-                ephemeral=True
-            )
-            return
-
-        # pega a cor pra botar no embed
-        embed_color = await self.get_dominant_color(image_url)
+        # pega a cor pra botar no embed (e ja verifica se a url funciona)
+        embed_color = await self.get_image_color(image_url)
+        if embed_color is None:
+            if not imagem:
+                await interaction.response.send_message(
+                    "TA ERRADO ISSO AI MERMAO",
+                    ephemeral=True
+                )
+                return
+            embed_color = discord.Color.blue()
 
         # cria o embed
         embed = discord.Embed(
@@ -0,0 +1,164 @@
+import discord
+from discord.ext import commands, tasks
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from storage import write_json_atomic
+
+class MessageCounter(commands.Cog):
+    """Contador de mensagens por canal mantido pelos eventos do gateway.
+
+    Cada canal guarda `count` (criadas - apagadas desde `since`) e `baseline`
+    (quantas já existiam antes de `since`). Canal criado com o bot rodando
+    começa com baseline 0 e a contagem é exata; canal que já existia tem o
+    baseline estimado uma vez, por uma página de histórico, e depois a
+    leitura é O(1).
+    """
+
+    FLUSH_INTERVAL = 60  # segundos entre gravações no disco
+    DOWNTIME_TOLERANCE = 60  # bot fora do ar por mais que isso perdeu eventos
+    SAMPLE_SIZE = 100  # uma página de histórico pra estimativa
+    MAX_EXTRAPOLATION = 10  # estimativa não passa de 10x a página amostrada
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.data_file = Path(__file__).parent.parent / 'data' / 'message_counts.json'
+        self.channels: Dict[int, dict] = {}
+        self._save_lock = asyncio.Lock()
+        self.load()
+
+    async def cog_load(self):
+        self.flush_loop.start()
+
+    async def cog_unload(self):
+        self.flush_loop.cancel()
+        await self.flush()
+
+    def load(self):
+        try:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Error loading message counts: {e}")
+            return
+
+        self.channels = {int(channel_id): entry for channel_id, entry in data.get('channels', {}).items()}
+        # Mensagens mandadas com o bot desligado não foram contadas
+        if time.time() - data.get('saved_at', 0) > self.DOWNTIME_TOLERANCE:
+            for entry in self.channels.values():
+                entry['exact'] = False
+
+    async def flush(self):
+        """Grava os contadores, mesmo sem mudança"""
+        # saved_at é o heartbeat: no boot diz se o bot ficou fora do ar, e
+        # servidor quieto não pode parecer evento perdido
+        async with self._save_lock:
+            snapshot = {
+                'saved_at': time.time(),
+                'channels': {str(channel_id): dict(entry) for channel_id, entry in self.channels.items()}
+            }
+            try:
+                await asyncio.to_thread(write_json_atomic, self.data_file, snapshot, separators=(',', ':'))
+            except OSError as e:
+                print(f"Error saving message counts: {e}")
+
+    @tasks.loop(seconds=FLUSH_INTERVAL)
+    async def flush_loop(self):
+        await self.flush()
+
+    def _entry(self, channel_id: int, baseline: Optional[int] = None, exact: bool = False) -> dict:
+        entry = self.channels.get(channel_id)
+        if entry is None:
+            entry = self.channels[channel_id] = {
+                'count': 0,
+                'baseline': baseline,
+                'exact': exact,
+                'since': time.time()
+            }
+        return entry
+
+    def peek(self, channel_id: int) -> Optional[Tuple[int, bool]]:
+        """(mensagens, exata?) sem tocar na API; None se o baseline ainda não é conhecido"""
+        entry = self.channels.get(channel_id)
+        if entry is None or entry['baseline'] is None:
+            return None
+        return max(entry['baseline'] + entry['count'], 0), entry['exact']
+
+    async def message_count(self, channel: discord.abc.Messageable) -> Tuple[int, bool]:
+        """(mensagens, exata?) do canal; estima o baseline na primeira vez"""
+        cached = self.peek(channel.id)
+        if cached is not None:
+            return cached
+
+        entry = self._entry(channel.id)
+        since = datetime.fromtimestamp(entry['since'], tz=timezone.utc)
+        baseline, complete = await self._estimate_before(channel, since)
+        entry['baseline'] = baseline
+        # Histórico coube numa página: contou tudo de verdade
+        entry['exact'] = complete
+        return self.peek(channel.id)
+
+    async def _estimate_before(self, channel: discord.abc.Messageable, since: datetime) -> Tuple[int, bool]:
+        """Mensagens antes de `since` por extrapolação de uma página de histórico.
+
+        Usa o ritmo da página mais recente (timestamps dos snowflakes) e
+        estende até a criação do canal. Se a página não enche, o número é exato.
+        """
+        messages = [message async for message in channel.history(limit=self.SAMPLE_SIZE, before=since)]
+        if len(messages) < self.SAMPLE_SIZE:
+            return len(messages), True
+
+        sampled = (since - messages[-1].created_at).total_seconds()
+        if sampled <= 0:
+            return len(messages), False
+        # Página recente num surto de conversa inflaria o canal inteiro
+        lifetime = min((since - channel.created_at).total_seconds(), sampled * self.MAX_EXTRAPOLATION)
+        return max(round(len(messages) * lifetime / sampled), len(messages)), False
+
+    def _deleted(self, entry: dict, message_ids) -> int:
+        """Quantas das apagadas saem do `count`.
+
+        Enquanto o baseline não foi estimado, mensagem anterior a `since`
+        não conta: a estimativa ainda vai ler o histórico já sem ela.
+        """
+        if entry['baseline'] is not None:
+            return len(message_ids)
+        since = discord.utils.time_snowflake(datetime.fromtimestamp(entry['since'], tz=timezone.utc))
+        return sum(1 for message_id in message_ids if message_id >= since)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.guild is None:
+            return
+        self._entry(message.channel.id)['count'] += 1
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        entry = self.channels.get(payload.channel_id)
+        if entry is not None:
+            entry['count'] -= self._deleted(entry, (payload.message_id,))
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        entry = self.channels.get(payload.channel_id)
+        if entry is not None:
+            entry['count'] -= self._deleted(entry, payload.message_ids)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        if isinstance(channel, discord.abc.Messageable):
+            # Nasceu com o bot olhando: contagem exata desde a primeira mensagem
+            self.channels.pop(channel.id, None)
+            self._entry(channel.id, baseline=0, exact=True)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.channels.pop(channel.id, None)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MessageCounter(bot))
@@ -2,85 +2,715 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from guild_config import MY_GUILD
+from storage import write_atomic
 import os
-from moviepy.editor import VideoFileClip
+import io
+import re
 import tempfile
 import asyncio
+import aiohttp
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Callable, Dict, Optional, Tuple
 from pathlib import Path
-import subprocess
 import shutil
+import json
+import hashlib
+import math
+import signal
+import time
+from collections import deque
+from datetime import timedelta
 
 @dataclass
 class ConversionSettings:
     ffmpeg_path: str = "C:\\ffmpeg\\ffmpeg.exe"
+    ffprobe_path: Optional[str] = None  # None = ffprobe na mesma pasta do ffmpeg
     max_size_mb: int = 8
+    # Degraus de qualidade (fps, largura máxima, cores), do melhor pro pior
+    quality_steps: Tuple[Tuple[int, int, int], ...] = (
+        (15, 480, 256),
+        (12, 400, 192),
+        (10, 360, 128),
+        (10, 320, 96),
+        (8, 240, 64),
+        (6, 200, 48),
+    )
+    # Bytes por pixel de um GIF com 256 cores e dither; ajustado a cada tentativa
+    bytes_per_pixel: float = 0.35
+    size_margin: float = 0.9  # mira em 90% do limite pra sobrar folga
+    # Na passada única o paletteuse espera a paleta, que só sai no fim do
+    # vídeo: todos os frames (já com fps/escala) ficam em RAM até lá. Acima
+    # disso usa duas passadas (paleta num arquivo, depois o gif)
+    frame_buffer_mb: int = 512
+    # Fila de conversão
+    workers: int = 2  # quantos ffmpeg rodando ao mesmo tempo
+    queue_size: int = 10  # jobs esperando, além dos que estão rodando
+    per_user_limit: int = 1  # jobs por usuário (na fila + rodando)
+    cpu_time_limit: int = 120  # segundos de CPU por processo ffmpeg (só Linux)
+    wall_time_limit: int = 300  # segundos de relógio por job, somando as tentativas
+    # Manda o download direto pro stdin do ffmpeg quando o container deixa
+    # (webm/mkv, mp4 com moov no começo ou fragmentado); senão vai pro disco
+    stream_input: bool = True
+    # Cache dos gifs convertidos (None desliga)
+    cache_dir: Optional[str] = None
+    cache_max_mb: int = 200
+
+    def cache_fingerprint(self) -> str:
+        """O que muda o gif gerado pro mesmo vídeo; entra na chave do cache"""
+        return json.dumps([
+            self.quality_steps, self.max_size_mb, self.bytes_per_pixel, self.size_margin
+        ])
+
+@dataclass
+class VideoInfo:
+    width: int
+    height: int
+    fps: float
+    duration: float
+
+class FfmpegError(Exception):
+    def __init__(self, returncode: int, stderr: str):
+        super().__init__(stderr or f"ffmpeg saiu com codigo {returncode}")
+        self.returncode = returncode
+
+# Linha do -progress (key=value); o resto do stderr é mensagem de erro
+PROGRESS_LINE = re.compile(r'([a-z0-9_]+)=(\S*)')
+
+def is_streamable(head: bytes) -> bool:
+    """Dá pra ler o container sequencialmente pelo stdin?
+
+    Matroska/WebM sempre. MP4/MOV só se o moov (ou o moof, no mp4
+    fragmentado) vem antes do mdat; senão o ffmpeg precisa dar seek.
+    """
+    if head.startswith(b'\x1a\x45\xdf\xa3'):  # EBML
+        return True
+
+    offset = 0
+    while offset + 8 <= len(head):
+        size = int.from_bytes(head[offset:offset + 4], 'big')
+        box = head[offset + 4:offset + 8]
+        if box in (b'moov', b'moof'):
+            return True
+        if box == b'mdat':
+            return False
+        if size == 1:  # tamanho de 64 bits logo depois do tipo
+            if offset + 16 > len(head):
+                return False
+            size = int.from_bytes(head[offset + 8:offset + 16], 'big')
+        if size < 8:
+            return False
+        offset += size
+    return False
+
+class VideoSource:
+    """De onde o ffmpeg lê o vídeo: arquivo em disco ou download em andamento.
+
+    O download roda numa task própria e vai enchendo `buffer`; no modo stream
+    o ffmpeg consome os chunks pelo stdin conforme eles chegam. Como tudo fica
+    em memória, uma nova tentativa (ou gravar em disco, se o container não dá
+    pra ler em stream) não precisa baixar de novo.
+    """
+
+    def __init__(self, total_size: Optional[int] = None, path: Optional[str] = None):
+        self.total_size = total_size
+        self.path = path
+        self.buffer = bytearray()
+        # Hash calculado conforme os chunks chegam, pra chave do cache
+        self.sha256 = hashlib.sha256()
+        self.complete = path is not None
+        self.error: Optional[BaseException] = None
+        # Duração/resolução lidas do começo do download (modo stream)
+        self.info: Optional[VideoInfo] = None
+        self._updated = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def download(cls, http_client, url: str, total_size: Optional[int] = None, chunk_size: int = 64 * 1024) -> 'VideoSource':
+        source = cls(total_size)
+        source._task = asyncio.create_task(source._download(http_client, url, chunk_size))
+        return source
+
+    @property
+    def streaming(self) -> bool:
+        return self.path is None
+
+    async def _download(self, http_client, url: str, chunk_size: int):
+        try:
+            # Sem timeout total: o download anda junto com a conversão
+            timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+            async with http_client.get(url, timeout=timeout) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    self.buffer += chunk
+                    self.sha256.update(chunk)
+                    self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.complete = True
+            self._notify()
+
+    def _notify(self):
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def _wait_for(self, size: float):
+        while len(self.buffer) < size and not self.complete:
+            await self._updated.wait()
+        if self.error:
+            raise self.error
+
+    async def peek(self, size: int) -> bytes:
+        """Primeiros `size` bytes (menos se o arquivo for menor)"""
+        await self._wait_for(size)
+        return bytes(self.buffer[:size])
+
+    async def iter_chunks(self, chunk_size: int = 64 * 1024):
+        """Chunks do começo ao fim, esperando o download quando alcança ele"""
+        offset = 0
+        while True:
+            await self._wait_for(offset + 1)
+            if offset >= len(self.buffer):
+                return
+            chunk = bytes(self.buffer[offset:offset + chunk_size])
+            offset += len(chunk)
+            yield chunk
+
+    async def digest(self) -> str:
+        """sha256 do vídeo inteiro (espera o download terminar)"""
+        await self._wait_for(math.inf)
+        return self.sha256.hexdigest()
+
+    async def save(self, path: str):
+        """Termina o download e grava em disco; daí o ffmpeg lê do arquivo"""
+        await self._wait_for(math.inf)
+        await asyncio.to_thread(Path(path).write_bytes, self.buffer)
+        self.path = path
+
+    async def close(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
 
 class GifConverter:
     def __init__(self, settings: ConversionSettings):
         self.settings = settings
 
-    def convert(self, input_path: str, output_path: str) -> Tuple[bool, Optional[str]]:
+    @property
+    def ffprobe_path(self) -> str:
+        if self.settings.ffprobe_path:
+            return self.settings.ffprobe_path
+        folder, name = os.path.split(self.settings.ffmpeg_path)
+        return os.path.join(folder, name.replace('ffmpeg', 'ffprobe'))
+
+    async def probe(self, input_path: str, data: Optional[bytes] = None) -> Optional[VideoInfo]:
+        """Lê duração, resolução e fps do vídeo com ffprobe.
+
+        Com `data`, o ffprobe lê esses bytes pelo stdin (`input_path` =
+        'pipe:0'): basta o começo do arquivo se os metadados estão nele.
+        """
+        cmd = [
+            self.ffprobe_path, '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'stream=width,height,avg_frame_rate:format=duration',
+            '-of', 'json', input_path
+        ]
         try:
-            if not os.path.exists(input_path):
-                return False, "Video file not found"
-            
-            ffmpeg = self.settings.ffmpeg_path
-            if not os.path.exists(ffmpeg):
-                return False, f"ffmpeg not found at {ffmpeg}"
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE if data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            stdout, _ = await process.communicate(data)
+            if process.returncode != 0:
+                return None
+            data = json.loads(stdout)
+            stream = data['streams'][0]
+            num, _, den = stream['avg_frame_rate'].partition('/')
+            fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+            return VideoInfo(
+                width=int(stream['width']),
+                height=int(stream['height']),
+                fps=fps or 30.0,
+                duration=float(data['format']['duration'])
+            )
+        except (OSError, KeyError, IndexError, ValueError):
+            return None
 
-            palette_path = output_path + "_palette.png"
-            
-            # Run commands silently
-            palette_cmd = [
-                ffmpeg, '-i', input_path,
-                '-vf', 'palettegen',
-                '-y', '-loglevel', 'error',  # Suppress output
-                palette_path
-            ]
-            
-            convert_cmd = [
-                ffmpeg, '-i', input_path, '-i', palette_path,
-                '-lavfi', '[0:v][1:v]paletteuse=dither=sierra2_4a',
-                '-y', '-loglevel', 'error',  # Suppress output
-                output_path
-            ]
-            
+    def estimate_size(self, info: VideoInfo, step: Tuple[int, int, int], calibration: float = 1.0) -> float:
+        """Estimativa do tamanho do GIF em bytes para um degrau de qualidade"""
+        fps, max_width, colors = step
+        width = min(max_width, info.width)
+        height = info.height * width / info.width
+        frames = info.duration * min(fps, info.fps)
+        # Menos cores = índices menores = LZW comprime melhor
+        color_factor = math.log2(colors) / 8
+        return width * height * frames * self.settings.bytes_per_pixel * color_factor * calibration
+
+    def pick_step(self, info: Optional[VideoInfo], start: int = 0, calibration: float = 1.0) -> int:
+        """Primeiro degrau a partir de `start` que cabe no limite (ou o último)"""
+        steps = self.settings.quality_steps
+        if info is None:
+            return min(start, len(steps) - 1)
+
+        target = self.settings.max_size_mb * 1024 * 1024 * self.settings.size_margin
+        for index in range(start, len(steps)):
+            if self.estimate_size(info, steps[index], calibration) <= target:
+                return index
+        return len(steps) - 1
+
+    def buffered_bytes(self, info: VideoInfo, step: Tuple[int, int, int]) -> float:
+        """RAM que a passada única segura em frames (RGBA) até a paleta sair"""
+        fps, max_width, _ = step
+        width = min(max_width, info.width)
+        height = info.height * width / info.width
+        return width * height * 4 * info.duration * min(fps, info.fps)
+
+    def single_pass(self, info: Optional[VideoInfo], step: Tuple[int, int, int]) -> bool:
+        # Sem saber duração/resolução não dá pra garantir a RAM: vai de duas passadas
+        return info is not None and self.buffered_bytes(info, step) <= self.settings.frame_buffer_mb * 1024 * 1024
+
+    def _video_filter(self, info: Optional[VideoInfo], step: Tuple[int, int, int]) -> str:
+        # fps/escala antes de tudo: nada em resolução cheia passa do decoder
+        # Nem fps nem largura passam do original: vídeo de 10fps não ganha
+        # frames duplicados e vídeo pequeno não é ampliado (igual à estimativa)
+        fps, max_width, _ = step
+        if info:
+            fps = min(fps, info.fps)
+        return f"fps={fps:g},scale='min(iw,{max_width})':-1:flags=lanczos"
+
+    def _output_args(self) -> list:
+        return [
+            '-loglevel', 'error',  # Suppress output
+            '-progress', 'pipe:2', '-nostats',  # progresso em key=value no stderr
+        ]
+
+    def build_command(self, input_path: str, info: Optional[VideoInfo], step: Tuple[int, int, int]) -> list:
+        colors = step[2]
+        # Uma passada só: o split manda o mesmo stream decodificado
+        # pro palettegen e pro paletteuse, sem arquivo de paleta no meio
+        filter_graph = (
+            f'[0:v]{self._video_filter(info, step)},split[a][b];'
+            f'[a]palettegen=max_colors={colors}:stats_mode=diff[p];'
+            '[b][p]paletteuse=dither=sierra2_4a'
+        )
+        return [
+            self.settings.ffmpeg_path, '-i', input_path,
+            '-filter_complex', filter_graph,
+            *self._output_args(),
+            '-f', 'gif', 'pipe:1'  # o gif sai pelo stdout, direto pra memória
+        ]
+
+    def build_palette_command(self, input_path: str, info: Optional[VideoInfo], step: Tuple[int, int, int]) -> list:
+        """Primeira de duas passadas: só a paleta, em PNG pelo stdout"""
+        colors = step[2]
+        return [
+            self.settings.ffmpeg_path, '-i', input_path,
+            '-vf', f'{self._video_filter(info, step)},palettegen=max_colors={colors}:stats_mode=diff',
+            *self._output_args(),
+            '-f', 'image2pipe', '-c:v', 'png', 'pipe:1'
+        ]
+
+    def build_paletteuse_command(self, input_path: str, palette_path: str, info: Optional[VideoInfo], step: Tuple[int, int, int]) -> list:
+        """Segunda passada: aplica a paleta frame a frame, sem segurar nada em RAM"""
+        return [
+            self.settings.ffmpeg_path, '-i', input_path, '-i', palette_path,
+            '-filter_complex', f'[0:v]{self._video_filter(info, step)}[v];[v][1:v]paletteuse=dither=sierra2_4a',
+            *self._output_args(),
+            '-f', 'gif', 'pipe:1'
+        ]
+
+    async def _encode(
+        self,
+        input_path: str,
+        source: VideoSource,
+        info: Optional[VideoInfo],
+        step: Tuple[int, int, int],
+        deadline: float,
+        on_progress: Optional[Callable[[float], None]] = None
+    ) -> Tuple[bytes, Optional[float]]:
+        """Gera o gif de um degrau, numa passada ou em duas conforme a RAM"""
+        duration = info.duration if info else None
+        if self.single_pass(info, step):
+            return await self._run(self.build_command(input_path, info, step), deadline, source, duration, on_progress)
+
+        def half(offset: float):
+            return (lambda fraction: on_progress(offset + fraction / 2)) if on_progress else None
+
+        palette, _ = await self._run(self.build_palette_command(input_path, info, step), deadline, source, duration, half(0.0))
+        if not palette:
+            raise FfmpegError(0, "ffmpeg nao gerou a paleta")
+
+        fd, palette_path = tempfile.mkstemp(suffix='.png')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(palette)
+            return await self._run(
+                self.build_paletteuse_command(input_path, palette_path, info, step),
+                deadline, source, duration, half(0.5)
+            )
+        finally:
+            os.unlink(palette_path)
+
+    def _limit_cpu(self, pid: int):
+        """Limita o tempo de CPU do ffmpeg já iniciado (o kernel mata quem passar).
+
+        Aplicado de fora com prlimit logo depois do spawn: preexec_fn não é
+        seguro com threads rodando no processo (to_thread, pool de cores...).
+        """
+        limit = self.settings.cpu_time_limit
+        if not limit:
+            return
+        try:
+            import resource
+            resource.prlimit(pid, resource.RLIMIT_CPU, (limit, limit))
+        except (ImportError, AttributeError):
+            pass  # prlimit só existe no Linux
+        except OSError:
+            pass  # processo já saiu
+
+    async def _run(
+        self,
+        cmd: list,
+        deadline: float,
+        source: VideoSource,
+        duration: Optional[float] = None,
+        on_progress: Optional[Callable[[float], None]] = None
+    ) -> Tuple[bytes, Optional[float]]:
+        """Roda o ffmpeg como subprocesso async e junta o gif do stdout.
+
+        Em stream o vídeo vai pro stdin. O progresso é o out_time do
+        -progress sobre a duração. Se o gif passar do limite o ffmpeg é morto
+        na hora (o gif só começa a sair depois que a paleta fica pronta).
+
+        Returns:
+            (gif, fração do vídeo processada quando foi cortado ou None se terminou)
+
+        Estoura asyncio.TimeoutError quando acaba o tempo do job; no timeout ou
+        cancelamento o processo é morto antes de propagar.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE if source.streaming else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        self._limit_cpu(process.pid)
+        max_bytes = self.settings.max_size_mb * 1024 * 1024
+        output = bytearray()
+        # Só as últimas linhas de erro, sem acumular o stderr inteiro
+        errors = deque(maxlen=20)
+        fraction = 0.0
+        cut = False
+
+        def report(value: float):
+            nonlocal fraction
+            fraction = min(value, 1.0)
+            if on_progress:
+                on_progress(fraction)
+
+        async def feed_input():
             try:
-                subprocess.run(palette_cmd, check=True, capture_output=True)
-                subprocess.run(convert_cmd, check=True, capture_output=True)
+                async for chunk in source.iter_chunks():
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # ffmpeg saiu antes: erro (aparece no stderr) ou gif cortado
             finally:
-                if os.path.exists(palette_path):
-                    os.unlink(palette_path)
+                process.stdin.close()
+
+        async def read_output():
+            nonlocal cut
+            while chunk := await process.stdout.read(64 * 1024):
+                output.extend(chunk)
+                if len(output) > max_bytes:
+                    cut = True
+                    process.kill()
+                    return
+
+        async def read_stderr():
+            async for line in process.stderr:
+                text = line.decode(errors='ignore').rstrip()
+                match = PROGRESS_LINE.fullmatch(text)
+                if not match:
+                    errors.append(text)
+                elif match[1] == 'out_time_us' and duration:
+                    try:
+                        report(int(match[2]) / 1_000_000 / duration)
+                    except ValueError:
+                        pass  # N/A no começo
+
+        tasks = [read_output(), read_stderr(), process.wait()]
+        if source.streaming:
+            tasks.append(feed_input())
+        work = asyncio.gather(*tasks)
+        try:
+            await asyncio.wait_for(work, timeout=remaining)
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+            work.cancel()
+            await asyncio.gather(work, process.wait(), return_exceptions=True)
+            raise
+
+        if cut:
+            return bytes(output), fraction
+        if process.returncode != 0:
+            raise FfmpegError(process.returncode, '\n'.join(errors))
+        return bytes(output), None
+
+    async def convert(
+        self,
+        source: VideoSource,
+        on_progress: Optional[Callable[[float, int], None]] = None
+    ) -> Tuple[Optional[bytes], Optional[str]]:
+        """Converte o vídeo; `on_progress(fração, tentativa)` recebe o andamento.
+
+        Returns:
+            (gif, None) ou (None, mensagem de erro)
+        """
+        deadline = time.monotonic() + self.settings.wall_time_limit
+        try:
+            if not source.streaming and not os.path.exists(source.path):
+                return None, "Video file not found"
             
-            if not self._verify_output(output_path):
-                return False, "mt grande o gif q merda q eu fiz"
-                
-            return True, None
+            ffmpeg = self.settings.ffmpeg_path
+            if not os.path.exists(ffmpeg):
+                return None, f"ffmpeg not found at {ffmpeg}"
+
+            # Escolhe fps/escala/cores pelo tamanho estimado e, se ainda
+            # passar do limite, tenta de novo com um degrau mais baixo.
+            # Em stream o ffprobe já rodou no começo do download
+            info = source.info if source.streaming else await self.probe(source.path)
+            calibration = 1.0
+            step_index = self.pick_step(info)
+            attempt = 1
+            input_path = 'pipe:0' if source.streaming else source.path
+
+            while True:
+                step = self.settings.quality_steps[step_index]
+                gif, cut_at = await self._encode(
+                    input_path,
+                    source,
+                    info,
+                    step,
+                    deadline,
+                    (lambda fraction, attempt=attempt: on_progress(fraction, attempt)) if on_progress else None
+                )
+
+                if cut_at is None:
+                    if not gif:
+                        return None, "ffmpeg nao gerou o gif"
+                    return gif, None
+                if step_index == len(self.settings.quality_steps) - 1:
+                    return None, "mt grande o gif mesmo na qualidade minima, tenta um video mais curto"
+
+                # Projeta o tamanho final pelo quanto já tinha processado e
+                # usa isso pra corrigir as próximas estimativas
+                if info and cut_at:
+                    calibration = len(gif) / cut_at / self.estimate_size(info, step)
+                step_index = self.pick_step(info, step_index + 1, calibration)
+                attempt += 1
             
+        except asyncio.TimeoutError:
+            return None, "demorou demais pra converter, tenta um video mais curto"
+        except FfmpegError as e:
+            if os.name == 'posix' and e.returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+                return None, "o ffmpeg passou do limite de cpu, tenta um video mais curto"
+            return None, f"erro pra converter: {e}"
         except Exception as e:
-            return False, f"erro pra converter: {str(e)}"
+            return None, f"erro pra converter: {str(e)}"
 
-    def _verify_output(self, output_path: str) -> bool:
-        if not os.path.exists(output_path):
-            return False
-        
-        size = os.path.getsize(output_path)
-        if size == 0:
-            return False
-            
-        if size > self.settings.max_size_mb * 1024 * 1024:
-            return False
-            
-        return True
+class GifCache:
+    """Cache em disco dos gifs já convertidos.
+
+    A chave é o sha256 do vídeo junto com as configurações que mudam o
+    resultado, então mexer nos degraus de qualidade invalida tudo sozinho.
+    Cada acerto atualiza o mtime do arquivo; quando a pasta passa de
+    `max_bytes` os de mtime mais antigo (menos usados) são apagados.
+    Os métodos são bloqueantes, chame com asyncio.to_thread.
+    """
+
+    def __init__(self, folder: str, max_bytes: int, fingerprint: str):
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint
+
+    def key(self, video_digest: str) -> str:
+        return hashlib.sha256(f"{self.fingerprint}:{video_digest}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.folder / f"{key}.gif"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def put(self, key: str, gif: bytes):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        write_atomic(self._path(key), gif)
+        self._evict()
+
+    def _evict(self):
+        files = []
+        for path in self.folder.glob('*.gif'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+class SchedulerError(Exception):
+    """Job recusado: fila cheia ou limite por usuário"""
+
+@dataclass
+class ConversionJob:
+    user_id: int
+    source: VideoSource
+    future: asyncio.Future
+    progress: float = 0.0  # fração da tentativa atual
+    attempt: int = 1
+
+class ConversionScheduler:
+    """Fila limitada de conversões com um número fixo de workers.
+
+    Cada worker roda um ffmpeg por vez, então nunca tem mais que `workers`
+    conversões disputando a CPU. Cancelar o future do job mata o ffmpeg.
+    """
+
+    def __init__(self, converter: GifConverter, settings: ConversionSettings):
+        self.converter = converter
+        self.settings = settings
+        # O limite é sobre `waiting`: job cancelado sai dali na hora, mas na
+        # Queue fica até um worker tirar, então ela não tem maxsize
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.waiting: list[ConversionJob] = []
+        self.user_jobs: Dict[int, int] = {}
+        self.workers: list[asyncio.Task] = []
+
+    def start(self):
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.settings.workers)]
+
+    def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        for job in list(self.waiting):
+            job.future.cancel()
+
+    def check(self, user_id: int):
+        """Levanta SchedulerError se o job não puder entrar na fila"""
+        if self.user_jobs.get(user_id, 0) >= self.settings.per_user_limit:
+            raise SchedulerError("calma ai, vc ja tem video na fila")
+        if len(self.waiting) >= self.settings.queue_size:
+            raise SchedulerError("fila cheia, tenta de novo daqui a pouco")
+
+    def submit(self, user_id: int, source: VideoSource) -> ConversionJob:
+        self.check(user_id)
+        job = ConversionJob(user_id, source, asyncio.get_running_loop().create_future())
+        self.queue.put_nowait(job)
+        self.waiting.append(job)
+        self.user_jobs[user_id] = self.user_jobs.get(user_id, 0) + 1
+        # Libera as vagas (do usuário e da fila) assim que o job acaba ou é
+        # cancelado, mesmo que ainda esteja parado na fila
+        job.future.add_done_callback(lambda _, job=job: self._release(job))
+        return job
+
+    def _release(self, job: ConversionJob):
+        if job in self.waiting:
+            self.waiting.remove(job)
+        self.user_jobs[job.user_id] -= 1
+        if not self.user_jobs[job.user_id]:
+            del self.user_jobs[job.user_id]
+
+    def position(self, job: ConversionJob) -> int:
+        """Posição na fila (1 = próximo); 0 se já está convertendo"""
+        try:
+            return self.waiting.index(job) + 1
+        except ValueError:
+            return 0
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            if job in self.waiting:
+                self.waiting.remove(job)
+            try:
+                if job.future.done():
+                    continue
+
+                def update(fraction: float, attempt: int, job=job):
+                    job.progress = fraction
+                    job.attempt = attempt
+
+                conversion = asyncio.create_task(
+                    self.converter.convert(job.source, update)
+                )
+                # Quem pediu desistiu (cancelou o future): derruba a conversão
+                job.future.add_done_callback(
+                    lambda future, conversion=conversion: conversion.cancel() if future.cancelled() else None
+                )
+                try:
+                    await asyncio.wait({conversion})
+                except asyncio.CancelledError:
+                    conversion.cancel()
+                    raise
+
+                if job.future.done():
+                    continue
+                if conversion.cancelled():
+                    job.future.cancel()
+                elif conversion.exception():
+                    job.future.set_exception(conversion.exception())
+                else:
+                    job.future.set_result(conversion.result())
+            finally:
+                self.queue.task_done()
 
 class MP4ToGif(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.max_file_size = 25 * 1024 * 1024
         self.supported_formats = ['.mp4', '.mov', '.avi', '.mkv', '.webm']
-        self.converter = GifConverter(ConversionSettings())
+        self.probe_head_bytes = 2 * 1024 * 1024  # começo do download que o ffprobe lê em stream
+        self.settings = ConversionSettings(
+            cache_dir=os.getenv('GIF_CACHE_DIR', str(Path(__file__).parent.parent / 'data' / 'gif_cache')),
+            cache_max_mb=int(os.getenv('GIF_CACHE_MAX_MB', '200'))
+        )
+        self.gif_cache = None
+        if self.settings.cache_dir and self.settings.cache_max_mb > 0:
+            self.gif_cache = GifCache(
+                self.settings.cache_dir,
+                self.settings.cache_max_mb * 1024 * 1024,
+                self.settings.cache_fingerprint()
+            )
+        self.converter = GifConverter(self.settings)
+        self.scheduler = ConversionScheduler(self.converter, self.settings)
+
+    async def cog_load(self):
+        self.scheduler.start()
+
+    async def cog_unload(self):
+        self.scheduler.stop()
 
     @app_commands.command(
         name="mp4togif",
@@ -94,6 +724,8 @@ class MP4ToGif(commands.Cog):
         await interaction.response.defer(thinking=True)
         
         temp_files = []
+        source = None
+        cache_lookup = None
         try:
             if not self._validate_input(video):
                 await interaction.followup.send(
@@ -102,25 +734,47 @@ class MP4ToGif(commands.Cog):
                 )
                 return
 
-            # Setup temp files
-            video_path, gif_path = await self._create_temp_files(video, interaction.id)
-            temp_files.extend([video_path, gif_path])
+            # Recusa logo, antes de baixar, se a fila não aceitar
+            self.scheduler.check(interaction.user.id)
 
-            # Download and convert
-            await video.save(video_path)
-            success, error_msg = await self._convert_video(video_path, gif_path)
+            # O download começa já, direto pra memória
+            source = VideoSource.download(self.bot.http_client, video.url, video.size)
+
+            # O hash só sai no fim do download; enquanto isso a conversão já
+            # anda. Acerto no cache cancela o job (vaga e CPU gastas até ali)
+            if self.gif_cache:
+                cache_lookup = asyncio.create_task(self._cache_lookup(source))
+
+            if not await self._probe_stream(source):
+                video_path = self._temp_video_path(video, interaction.id)
+                temp_files.append(video_path)
+                await source.save(video_path)
+
+            result = await self._convert_video(interaction, source, cache_lookup)
+            if result is None:
+                return
+            gif, error_msg = result
 
-            if success:
-                await self._send_success_response(interaction, gif_path)
+            if gif:
+                if cache_lookup:
+                    await self._cache_store(cache_lookup, gif)
+                await self._send_success_response(interaction, gif)
             else:
                 await self._send_error_response(interaction, error_msg)
 
+        except SchedulerError as e:
+            await interaction.followup.send(str(e), ephemeral=True)
         except Exception as e:
             await interaction.followup.send(
                 f"erro ao processar: {str(e)}",
                 ephemeral=True
             )
         finally:
+            if cache_lookup:
+                cache_lookup.cancel()
+                await asyncio.gather(cache_lookup, return_exceptions=True)
+            if source:
+                await source.close()
             await self._cleanup_files(temp_files)
 
     def _validate_input(self, video: discord.Attachment) -> bool:
@@ -128,25 +782,108 @@ class MP4ToGif(commands.Cog):
             return False
         return os.path.splitext(video.filename)[1].lower() in self.supported_formats
 
-    async def _create_temp_files(self, video: discord.Attachment, interaction_id: int) -> Tuple[str, str]:
+    async def _probe_stream(self, source: VideoSource) -> bool:
+        """Decide se o vídeo vai direto pro stdin do ffmpeg.
+
+        Só se o container dá pra ler em sequência e o ffprobe acha duração e
+        resolução no começo do arquivo; sem isso a escolha do degrau e o
+        progresso ficariam no escuro, então vai pro disco e ffprobe normal.
+        """
+        if not self.settings.stream_input:
+            return False
+        head = await source.peek(self.probe_head_bytes)
+        if not is_streamable(head):
+            return False
+        source.info = await self.converter.probe('pipe:0', head)
+        return source.info is not None
+
+    def _temp_video_path(self, video: discord.Attachment, interaction_id: int) -> str:
         temp_dir = Path(tempfile.gettempdir())
-        video_path = str(temp_dir / f"temp_video_{interaction_id}{os.path.splitext(video.filename)[1]}")
-        gif_path = str(temp_dir / f"temp_gif_{interaction_id}.gif")
-        return video_path, gif_path
-
-    async def _convert_video(self, video_path: str, gif_path: str) -> Tuple[bool, Optional[str]]:
-        result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            self.converter.convert,  # Call without lambda
-            video_path,
-            gif_path
-        )
-        return result
+        return str(temp_dir / f"temp_video_{interaction_id}{os.path.splitext(video.filename)[1]}")
+
+    async def _convert_video(
+        self,
+        interaction: discord.Interaction,
+        source: VideoSource,
+        cache_lookup: Optional[asyncio.Task] = None
+    ) -> Optional[Tuple[Optional[bytes], Optional[str]]]:
+        """Põe o job na fila e vai mostrando posição/progresso na resposta.
+
+        Se `cache_lookup` achar o gif antes da conversão acabar, cancela o
+        job e devolve o do cache. Retorna None se a interação expirou (aí não
+        tem mais como responder e a conversão é cancelada).
+        """
+        job = self.scheduler.submit(interaction.user.id, source)
+        # Token da interação vale 15 min; cancela antes disso
+        expires_at = interaction.created_at + timedelta(minutes=15) - timedelta(seconds=30)
+
+        watching = {job.future}
+        if cache_lookup:
+            watching.add(cache_lookup)
+        status = None
+        while True:
+            try:
+                await asyncio.wait(watching, timeout=3, return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+
+            if job.future.done():
+                return job.future.result()
+            if cache_lookup in watching and cache_lookup.done():
+                watching.discard(cache_lookup)
+                # Erro no download aparece também na conversão; aqui só ignora
+                if not cache_lookup.cancelled() and not cache_lookup.exception():
+                    _, cached = cache_lookup.result()
+                    if cached:
+                        job.future.cancel()
+                        return cached, None
+
+            if discord.utils.utcnow() >= expires_at:
+                job.future.cancel()
+                return None
+
+            position = self.scheduler.position(job)
+            if position:
+                new_status = f"na fila, posicao {position}..."
+            else:
+                new_status = f"convertendo... {int(job.progress * 100) // 5 * 5}%"
+                if job.attempt > 1:
+                    new_status += f" (tentativa {job.attempt}, diminuindo a qualidade)"
+
+            if new_status != status:
+                status = new_status
+                try:
+                    await interaction.edit_original_response(content=status)
+                except discord.NotFound:
+                    # Interação sumiu: ninguém vai ver o gif
+                    job.future.cancel()
+                    return None
+                except discord.HTTPException:
+                    pass
+
+    async def _cache_lookup(self, source: VideoSource) -> Tuple[str, Optional[bytes]]:
+        """Chave do vídeo no cache (espera o download) e o gif guardado, se tiver"""
+        key = self.gif_cache.key(await source.digest())
+        return key, await asyncio.to_thread(self.gif_cache.get, key)
+
+    async def _cache_store(self, cache_lookup: asyncio.Task, gif: bytes):
+        """Guarda o gif convertido, a não ser que ele tenha vindo do cache"""
+        try:
+            key, cached = await cache_lookup
+        except Exception:
+            return
+        if cached:
+            return
+        try:
+            await asyncio.to_thread(self.gif_cache.put, key, gif)
+        except OSError as e:
+            print(f"Error saving gif cache: {e}")
 
-    async def _send_success_response(self, interaction: discord.Interaction, gif_path: str):
+    async def _send_success_response(self, interaction: discord.Interaction, gif: bytes):
         await interaction.followup.send(
             "gif aq man:",
-            file=discord.File(gif_path, filename="converted.gif")
+            file=discord.File(io.BytesIO(gif), filename="converted.gif")
         )
 
     async def _send_error_response(self, interaction: discord.Interaction, error_msg: Optional[str]):
@@ -2,54 +2,59 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from guild_config import MY_GUILD
-import json
+import asyncio
+import time
 from datetime import datetime
 from pathlib import Path
+from storage import JsonlStore
+
+# Contagem de mensagens vem do cog message_counter
+DEPENDS = ('message_counter',)
 
 class Nuke(commands.Cog):
+    HISTORY_QUEUE_SIZE = 100  # registros esperando o writer gravar
+
     def __init__(self, bot):
         self.bot = bot
-        self.data_file = Path(__file__).parent.parent / 'data' / 'nuke_history.json'
-        self.ensure_data_file()
+        # Histórico append-only (JSONL); importa o nuke_history.json antigo uma vez
+        data_dir = Path(__file__).parent.parent / 'data'
+        self.history = JsonlStore(
+            data_dir / 'nuke_history.jsonl',
+            legacy_path=data_dir / 'nuke_history.json'
+        )
+        self.history_queue: asyncio.Queue = asyncio.Queue(maxsize=self.HISTORY_QUEUE_SIZE)
+        self.writer_task = None
 
-    def ensure_data_file(self):
-        try:
-            self.data_file.parent.mkdir(exist_ok=True)
-            if not self.data_file.exists() or self.data_file.stat().st_size == 0:
-                with open(self.data_file, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
-        except Exception as e:
-            print(f"Error creating data file: {e}")
+    async def cog_load(self):
+        self.writer_task = asyncio.create_task(self.history_writer())
 
-    async def save_nuke_data(self, interaction: discord.Interaction, channel: discord.TextChannel):
+    async def cog_unload(self):
+        # Dá um tempo pro writer esvaziar a fila antes de parar
         try:
-            # Get message count from channel
-            message_count = 0
-            async for _ in channel.history(limit=None):
-                message_count += 1
-
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                history = json.loads(content) if content.strip() else []
-            
-            current_time = datetime.now()
-            
-            entry = {
-                'usuario': interaction.user.name,
-                'data': current_time.strftime('%d/%m/%Y'),
-                'hora': current_time.strftime('%H:%M:%S'),
-                'numero_de_mensagens': message_count,
-                'canal_nukado': channel.name
-            }
-            
-            history.append(entry)
-            
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
-            print("Nuke data saved successfully")
-            
-        except Exception as e:
-            print(f"Error saving nuke data: {e}")
+            await asyncio.wait_for(self.history_queue.join(), timeout=10)
+        except asyncio.TimeoutError:
+            print(f"Nuke history: {self.history_queue.qsize()} entries not saved")
+        if self.writer_task:
+            self.writer_task.cancel()
+
+    async def history_writer(self):
+        """Grava os registros da fila no histórico, um por vez, fora do comando"""
+        while True:
+            entry = await self.history_queue.get()
+            try:
+                await self.history.append(entry)
+                print("Nuke data saved successfully")
+            except Exception as e:
+                print(f"Error saving nuke data: {e}")
+            finally:
+                self.history_queue.task_done()
+
+    async def count_messages(self, channel: discord.TextChannel):
+        """(mensagens, exata?) pelo contador do gateway, sem varrer o histórico"""
+        counter = self.bot.get_cog('MessageCounter')
+        if not counter:
+            return None, False
+        return await counter.message_count(channel)
 
     @app_commands.command(name="nuke", description="nukando")
     @app_commands.guilds(MY_GUILD)
@@ -59,38 +64,66 @@ class Nuke(commands.Cog):
             await interaction.response.send_message("sem cargo bro", ephemeral=True)
             return
 
-        try:
-            # Save nuke data before executing
-            await self.save_nuke_data(interaction, channel)
+        # Responde antes de qualquer coisa pra não estourar os 3s da interação
+        started = time.perf_counter()
+        await interaction.response.send_message(f"ACABANDO COM TUDO {channel.mention}...")
 
-            # Rest of the existing code...
-            position = channel.position
-            category = channel.category
-            overwrites = channel.overwrites
-            name = channel.name
-            topic = channel.topic
-            slowmode = channel.slowmode_delay
-            nsfw = channel.nsfw
+        latencies = {}
+        phase_started = started
 
-            await interaction.response.send_message(f"ACABANDO COM TUDO {channel.mention}...")
+        def mark(phase: str):
+            nonlocal phase_started
+            now = time.perf_counter()
+            latencies[phase] = round((now - phase_started) * 1000)
+            phase_started = now
+
+        mark('resposta')
+        current_time = datetime.now()
+        # Registro sai mesmo se der erro no meio; 'resultado' diz como acabou
+        record = {
+            'usuario': interaction.user.name,
+            'data': current_time.strftime('%d/%m/%Y'),
+            'hora': current_time.strftime('%H:%M:%S'),
+            'numero_de_mensagens': None,
+            'contagem_exata': False,
+            'canal_nukado': channel.name,
+            'resultado': 'ok',
+            'latencia_ms': latencies
+        }
+        try:
+            message_count, exact = await self.count_messages(channel)
+            record['numero_de_mensagens'] = message_count
+            record['contagem_exata'] = exact
+            mark('contagem')
 
+            # clone copia nome, permissões, categoria, tópico, slowmode e nsfw
+            position = channel.position
+            new_channel = await channel.clone(reason=f"nuke por {interaction.user.name}")
+            mark('clone')
             await channel.delete()
-            new_channel = await interaction.guild.create_text_channel(
-                name=name,
-                overwrites=overwrites,
-                category=category,
-                topic=topic,
-                slowmode_delay=slowmode,
-                nsfw=nsfw,
-                position=position
-            )
+            mark('delete')
+            await new_channel.edit(position=position)
+            mark('posicao')
 
-            await new_channel.send(f"nukado por {interaction.user.name}")
+            latencies['total'] = round((time.perf_counter() - started) * 1000)
+            await new_channel.send(
+                f"nukado por {interaction.user.name} em {latencies['total']}ms "
+                f"(clone {latencies['clone']}ms, delete {latencies['delete']}ms)"
+            )
 
         except discord.Forbidden:
-            await interaction.response.send_message("to sem perm", ephemeral=True)
+            record['resultado'] = 'sem permissao'
+            await interaction.followup.send("to sem perm", ephemeral=True)
         except Exception as e:
-            await interaction.response.send_message(f"erro: {str(e)}", ephemeral=True)
+            record['resultado'] = f"erro: {e}"
+            await interaction.followup.send(f"erro: {str(e)}", ephemeral=True)
+        finally:
+            latencies.setdefault('total', round((time.perf_counter() - started) * 1000))
+            # Não segura o comando esperando o writer: fila cheia descarta
+            try:
+                self.history_queue.put_nowait(record)
+            except asyncio.QueueFull:
+                print(f"Nuke history queue full, dropping entry for #{channel.name}")
 
 async def setup(bot):
     await bot.add_cog(Nuke(bot))
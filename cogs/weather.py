@@ -2,13 +2,14 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from guild_config import MY_GUILD
-import aiohttp
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 import os
-import json
+import unicodedata
 from pathlib import Path
+from cache import LRUCache, MISSING, SingleFlight
+from storage import JsonlStore
 
 load_dotenv()
 
@@ -18,28 +19,41 @@ class Weather(commands.Cog):
         self.api_key = os.getenv('WEATHER_API_KEY')
         self.base_url = "http://api.openweathermap.org/data/2.5"
         self.geo_url = "http://api.openweathermap.org/geo/1.0/direct"
-        # Modificar para usar caminho absoluto
-        self.data_file = Path(__file__).parent.parent / 'data' / 'weather_history.json'
-        self.ensure_data_file()
-
-    def ensure_data_file(self):
-        try:
-            self.data_file.parent.mkdir(exist_ok=True)
-            if not self.data_file.exists() or self.data_file.stat().st_size == 0:
-                with open(self.data_file, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
-        except Exception as e:
-            print(f"Error creating data file: {e}")
-
-    def save_weather_data(self, user_id: int, location: str, weather_data: dict, interaction: discord.Interaction):
+        # Histórico append-only (JSONL); importa o weather_history.json antigo uma vez
+        data_dir = Path(__file__).parent.parent / 'data'
+        max_segments = os.getenv('WEATHER_HISTORY_MAX_SEGMENTS')
+        self.history = JsonlStore(
+            data_dir / 'weather_history.jsonl',
+            legacy_path=data_dir / 'weather_history.json',
+            max_bytes=int(os.getenv('WEATHER_HISTORY_MAX_BYTES', str(50 * 1024 * 1024))),
+            max_segments=int(max_segments) if max_segments else None,
+            compress_rotated=os.getenv('WEATHER_HISTORY_COMPRESS', '1') == '1'
+        )
+
+        # Cache de geocoding: local normalizado -> (lat, lon), ou None se não existe
+        self.geocode_cache = LRUCache(
+            maxsize=int(os.getenv('GEOCODE_CACHE_SIZE', '2000')),
+            ttl=30 * 24 * 3600,
+            path=data_dir / 'geocode_cache.json'
+        )
+        self.geocode_negative_ttl = 24 * 3600  # typo fica guardado só 1 dia
+        self.geocode_cache.load()
+
+        # Cache curto das respostas do tempo, por coordenada arredondada
+        self.weather_cache = LRUCache(
+            maxsize=512,
+            ttl=float(os.getenv('WEATHER_CACHE_TTL', '600'))
+        )
+        self.weather_flight = SingleFlight()
+
+    @staticmethod
+    def normalize_location(location: str) -> str:
+        """Normaliza o nome do local pra usar como chave do cache"""
+        location = unicodedata.normalize('NFKC', location)
+        return ' '.join(location.casefold().split())
+
+    async def save_weather_data(self, user_id: int, location: str, weather_data: dict, interaction: discord.Interaction):
         try:
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    history = json.loads(content) if content.strip() else []
-            except (json.JSONDecodeError, FileNotFoundError):
-                history = []
-            
             current_time = datetime.utcnow()
             
             entry = {
@@ -58,43 +72,68 @@ class Weather(commands.Cog):
                 'weather_data': weather_data
             }
             
-            history.append(entry)
-            
-            # Removida a limitação de 1000 entradas para manter todo histórico
-            
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
-            print("Data saved successfully")
+            # Histórico completo sem limite: o append é O(1) e a rotação cuida do tamanho
+            await self.history.append(entry)
             
         except Exception as e:
             print(f"Error saving weather data: {e}")
 
     async def get_coordinates(self, location: str):
-        async with aiohttp.ClientSession() as session:
-            params = {
-                'q': location,
-                'limit': 1,
-                'appid': self.api_key
-            }
-            async with session.get(self.geo_url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data:
-                        return data[0]['lat'], data[0]['lon']
-                return None
+        key = self.normalize_location(location)
+        cached = self.geocode_cache.get(key)
+        if cached is not MISSING:
+            return tuple(cached) if cached else None
+
+        coords = await self.fetch_coordinates(location)
+        if coords is MISSING:
+            # Erro da API não é cacheado, só "lugar não existe"
+            return None
+        if coords:
+            self.geocode_cache.set(key, list(coords))
+        else:
+            self.geocode_cache.set(key, None, ttl=self.geocode_negative_ttl)
+        await self.geocode_cache.save_async()
+        return coords
+
+    async def fetch_coordinates(self, location: str):
+        params = {
+            'q': location,
+            'limit': 1,
+            'appid': self.api_key
+        }
+        async with self.bot.http_client.get(self.geo_url, params=params) as response:
+            if response.status != 200:
+                return MISSING
+            data = await response.json()
+            if data:
+                return data[0]['lat'], data[0]['lon']
+            return None
 
     async def get_weather(self, lat: float, lon: float):
-        async with aiohttp.ClientSession() as session:
-            params = {
-                'lat': lat,
-                'lon': lon,
-                'appid': self.api_key,
-                'units': 'metric',  # para Celsius
-            }
-            async with session.get(f"{self.base_url}/weather", params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                return None
+        # ~1km de precisão, suficiente pro tempo e aumenta a taxa de acerto
+        lat, lon = round(lat, 2), round(lon, 2)
+        key = f"{lat},{lon}"
+
+        cached = self.weather_cache.get(key)
+        if cached is not MISSING:
+            return cached
+
+        weather_data = await self.weather_flight.do(key, lambda: self.fetch_weather(lat, lon))
+        if weather_data:
+            self.weather_cache.set(key, weather_data)
+        return weather_data
+
+    async def fetch_weather(self, lat: float, lon: float):
+        params = {
+            'lat': lat,
+            'lon': lon,
+            'appid': self.api_key,
+            'units': 'metric',  # para Celsius
+        }
+        async with self.bot.http_client.get(f"{self.base_url}/weather", params=params) as response:
+            if response.status == 200:
+                return await response.json()
+            return None
 
     @app_commands.command(
         name="tempo",
@@ -121,7 +160,7 @@ class Weather(commands.Cog):
                 return
 
             # Save weather data
-            self.save_weather_data(interaction.user.id, local, weather_data, interaction)
+            await self.save_weather_data(interaction.user.id, local, weather_data, interaction)
 
             # Criar embed
             embed = discord.Embed(
@@ -173,5 +212,35 @@ class Weather(commands.Cog):
         except Exception as e:
             await interaction.followup.send(f"erro: {str(e)}")
 
+    def cache_stats(self) -> dict:
+        stats = {
+            'geocode': self.geocode_cache.stats(),
+            'weather': self.weather_cache.stats()
+        }
+        stats['weather']['coalesced'] = self.weather_flight.coalesced
+        return stats
+
+    @app_commands.command(
+        name="tempo_cache",
+        description="estatisticas do cache do /tempo"
+    )
+    @app_commands.guilds(MY_GUILD)
+    @app_commands.default_permissions(manage_guild=True)
+    async def tempo_cache(self, interaction: discord.Interaction):
+        stats = self.cache_stats()
+        embed = discord.Embed(title="cache do /tempo", color=discord.Color.blue())
+        for name, data in stats.items():
+            value = (
+                f"**hits:** {data['hits']}\n"
+                f"**misses:** {data['misses']}\n"
+                f"**taxa de acerto:** {data['hit_rate']:.1%}\n"
+                f"**entradas:** {data['size']}/{data['maxsize']}\n"
+                f"**ttl:** {data['ttl']:.0f}s"
+            )
+            if 'coalesced' in data:
+                value += f"\n**coalescidas:** {data['coalesced']}"
+            embed.add_field(name=name, value=value, inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(Weather(bot))
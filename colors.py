@@ -0,0 +1,119 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from PIL import Image
+
+from cache import LRUCache, MISSING
+
+RGB = Tuple[int, int, int]
+
+# Pool próprio pra decode/cálculo de cor não disputar o executor padrão do loop
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='colors')
+
+
+def load_pixels(data: bytes, size: int = 100):
+    """Decodifica a imagem (só o primeiro frame se for animada) em um array Nx4 RGBA"""
+    import numpy as np  # lazy: só carrega quando alguém pede uma cor
+
+    image = Image.open(BytesIO(data))
+    # JPEG pode decodificar direto numa escala menor, bem mais rápido
+    image.draft('RGB', (size, size))
+    image = image.convert('RGBA')
+    image.thumbnail((size, size))
+    return np.asarray(image, dtype=np.uint8).reshape(-1, 4)
+
+
+def average_color(pixels, alpha_threshold: int = 0) -> Optional[RGB]:
+    """Média das cores dos pixels visíveis (alpha acima do limite)"""
+    rgb = pixels[pixels[:, 3] > alpha_threshold, :3]
+    if not len(rgb):
+        return None
+    r, g, b = rgb.mean(axis=0, dtype='float64')
+    return int(r), int(g), int(b)
+
+
+def dominant_color(pixels, bits: int = 4, alpha_threshold: int = 0) -> Optional[RGB]:
+    """Cor mais frequente usando um histograma quantizado (2**bits níveis por canal).
+
+    Devolve a média dos pixels do balde vencedor, então a cor final não fica
+    "quadriculada" pela quantização.
+    """
+    import numpy as np
+
+    rgb = pixels[pixels[:, 3] > alpha_threshold, :3]
+    if not len(rgb):
+        return None
+
+    quantized = (rgb >> (8 - bits)).astype(np.int32)
+    index = (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2]
+    counts = np.bincount(index, minlength=1 << (3 * bits))
+    winner = rgb[index == counts.argmax()]
+    r, g, b = winner.mean(axis=0, dtype='float64')
+    return int(r), int(g), int(b)
+
+
+def extract_color(data: bytes, mode: str = 'average', size: int = 100, alpha_threshold: int = 0, bits: int = 4) -> Optional[RGB]:
+    """Extrai a cor de uma imagem em bytes; `mode` é 'average' ou 'dominant'"""
+    pixels = load_pixels(data, size)
+    if mode == 'average':
+        return average_color(pixels, alpha_threshold)
+    if mode == 'dominant':
+        return dominant_color(pixels, bits, alpha_threshold)
+    raise ValueError(f"modo de cor desconhecido: {mode}")
+
+
+async def extract_color_async(data: bytes, mode: str = 'average', **kwargs) -> Optional[RGB]:
+    """extract_color rodando no pool de threads, sem travar o event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, lambda: extract_color(data, mode, **kwargs))
+
+
+class ColorCache:
+    """Cache das cores já calculadas, por hash do avatar ou URL da imagem.
+
+    Avatares do Discord têm o hash do conteúdo no nome, então a cor calculada
+    vale pra sempre. Num acerto não tem download nem decode nenhum.
+    """
+
+    # CDN do Discord põe assinatura que expira na query; o caminho já é único
+    DISCORD_CDN_HOSTS = ('cdn.discordapp.com', 'media.discordapp.net')
+
+    def __init__(self, maxsize: int = 5000, path: Optional[Path] = None):
+        self.cache = LRUCache(maxsize=maxsize, path=path)
+        self.cache.load()
+
+    @staticmethod
+    def avatar_key(asset) -> str:
+        return f"avatar:{asset.key}"
+
+    @classmethod
+    def url_key(cls, url: str) -> str:
+        parts = urlsplit(url)
+        if parts.hostname in cls.DISCORD_CDN_HOSTS:
+            parts = parts._replace(query='', fragment='')
+        return f"url:{urlunsplit(parts)}"
+
+    async def get_or_compute(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Optional[bytes]]],
+        mode: str = 'average'
+    ) -> Optional[RGB]:
+        """Devolve a cor do cache ou baixa (via `fetch`) e calcula uma vez"""
+        cache_key = f"{mode}:{key}"
+        cached = self.cache.get(cache_key)
+        if cached is not MISSING:
+            return tuple(cached) if cached else None
+
+        data = await fetch()
+        if not data:
+            return None
+
+        color = await extract_color_async(data, mode)
+        self.cache.set(cache_key, list(color) if color else None)
+        await self.cache.save_async()
+        return color
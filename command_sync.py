@@ -0,0 +1,79 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import discord
+from discord import app_commands
+
+from storage import write_json_atomic
+
+
+class CommandSync:
+    """Sincroniza a árvore de comandos só quando ela mudou.
+
+    Guarda em disco um hash de cada comando por escopo (global e cada
+    guild). No boot compara com a árvore atual e só chama `tree.sync` para os
+    escopos que mudaram, mostrando o que foi adicionado, removido ou alterado.
+    """
+
+    def __init__(self, tree: app_commands.CommandTree, path: Path):
+        self.tree = tree
+        self.path = Path(path)
+        self.state: Dict[str, Dict[str, str]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        write_json_atomic(self.path, self.state, indent=2, sort_keys=True)
+
+    def snapshot(self, guild: Optional[discord.abc.Snowflake]) -> Dict[str, str]:
+        """Hash estável de cada comando registrado no escopo"""
+        hashes = {}
+        for command in self.tree.get_commands(guild=guild):
+            payload = command.to_dict(self.tree)
+            key = f"{payload.get('type', 1)}:{payload['name']}"
+            encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+            hashes[key] = hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+        return hashes
+
+    @staticmethod
+    def diff(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, list]:
+        return {
+            'added': sorted(new.keys() - old.keys()),
+            'removed': sorted(old.keys() - new.keys()),
+            'changed': sorted(k for k in new.keys() & old.keys() if new[k] != old[k])
+        }
+
+    async def sync(self, guilds: Iterable[Optional[discord.abc.Snowflake]], force: bool = False) -> int:
+        """Sincroniza os escopos alterados; retorna quantos foram sincronizados"""
+        synced = 0
+        for guild in guilds:
+            scope = 'global' if guild is None else str(guild.id)
+            current = self.snapshot(guild)
+            stored = self.state.get(scope)
+
+            if not force and stored == current:
+                print(f"comandos {scope}: sem mudança, pulando sync")
+                continue
+
+            if stored is None:
+                print(f"comandos {scope}: sem hash salvo, sincronizando {len(current)} comandos")
+            else:
+                changes = self.diff(stored, current)
+                summary = ', '.join(
+                    f"{kind}: {', '.join(names)}" for kind, names in changes.items() if names
+                )
+                print(f"comandos {scope}: {summary or 'sync forçado'}")
+
+            await self.tree.sync(guild=guild)
+            self.state[scope] = current
+            self._save()
+            synced += 1
+        return synced
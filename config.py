@@ -12,4 +12,27 @@ WEATHER_API_KEY = os.getenv('WEATHER_API_KEY')
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY not found in .env file")
 if not WEATHER_API_KEY:
-    raise ValueError("WEATHER_API_KEY not found in .env file")
\ No newline at end of file
+    raise ValueError("WEATHER_API_KEY not found in .env file")
+
+# HTTP client compartilhado (pool de conexões)
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', '100'))
+HTTP_LIMIT_PER_HOST = int(os.getenv('HTTP_LIMIT_PER_HOST', '10'))
+HTTP_DNS_TTL = int(os.getenv('HTTP_DNS_TTL', '300'))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '30'))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '15'))
+# Limite de download de imagens (cor do /info e /enviar)
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', str(8 * 1024 * 1024)))
+
+
+# Carregamento de cogs: listas separadas por vírgula (ex: COGS_DISABLED=nuke,gemini)
+COGS_ENABLED = [c.strip() for c in os.getenv('COGS_ENABLED', '').split(',') if c.strip()] or None
+COGS_DISABLED = [c.strip() for c in os.getenv('COGS_DISABLED', '').split(',') if c.strip()]
+# COGS_PARALLEL=0 carrega um por vez e mostra o RSS de cada cog
+COGS_PARALLEL = os.getenv('COGS_PARALLEL', '1') == '1'
+
+# COMMANDS_FORCE_SYNC=1 sincroniza os comandos mesmo sem mudança no hash
+COMMANDS_FORCE_SYNC = os.getenv('COMMANDS_FORCE_SYNC', '0') == '1'
+
+# Cache de cores do /info e /enviar
+COLOR_CACHE_SIZE = int(os.getenv('COLOR_CACHE_SIZE', '5000'))
+COLOR_CACHE_PERSIST = os.getenv('COLOR_CACHE_PERSIST', '1') == '1'
@@ -0,0 +1,169 @@
+import aiohttp
+from typing import Optional, Tuple
+
+# Assinaturas (magic bytes) dos formatos de imagem aceitos
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+)
+
+
+class ImageFetchError(Exception):
+    """URL não aponta pra uma imagem válida ou ela passa do limite de tamanho"""
+
+
+def gif_first_frame_end(data: bytes) -> Optional[int]:
+    """Posição onde termina o primeiro frame do GIF (None se ainda não chegou)"""
+    def color_table(packed: int) -> int:
+        return 3 * 2 ** ((packed & 0x07) + 1) if packed & 0x80 else 0
+
+    def skip_sub_blocks(pos: int) -> Optional[int]:
+        while pos < len(data):
+            size = data[pos]
+            pos += 1
+            if size == 0:
+                return pos
+            pos += size
+        return None
+
+    if len(data) < 13:
+        return None
+    pos = 13 + color_table(data[10])
+    while pos < len(data):
+        block = data[pos]
+        if block == 0x21:  # extensão
+            pos = skip_sub_blocks(pos + 2)
+        elif block == 0x2C:  # descritor de imagem + dados LZW
+            if pos + 10 > len(data):
+                return None
+            pos = skip_sub_blocks(pos + 10 + color_table(data[pos + 9]) + 1)
+            return pos
+        elif block == 0x3B:  # trailer
+            return pos
+        else:
+            raise ImageFetchError("GIF inválido")
+        if pos is None:
+            return None
+    return None
+
+
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """Descobre o formato da imagem pelos primeiros bytes"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for signature, image_format in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    return None
+
+
+class HttpClient:
+    """Cliente HTTP compartilhado por todos os cogs do bot.
+
+    Mantém uma única ClientSession com pool de conexões, keep-alive e cache de
+    DNS, pra que cada comando reaproveite conexões já aquecidas em vez de abrir
+    uma sessão nova (TCP + TLS + DNS) a cada chamada.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        timeout: float = 15.0,
+        image_max_bytes: int = 8 * 1024 * 1024
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.image_max_bytes = image_max_bytes
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """Cria o connector e a sessão (precisa rodar dentro do event loop)"""
+        if self._session and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+            enable_cleanup_closed=True
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HttpClient não foi iniciado")
+        return self._session
+
+    def get(self, url: str, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        return self.session.head(url, **kwargs)
+
+    async def fetch_image(self, url: str, max_bytes: Optional[int] = None, chunk_size: int = 64 * 1024) -> Tuple[bytes, str]:
+        """Baixa uma imagem em streaming, com limite de bytes.
+
+        O formato é detectado pelo primeiro chunk, sem HEAD separado; se não
+        for imagem o download para ali. Imagens acima do limite abortam, menos
+        GIF: como só o primeiro frame é usado, o download para assim que ele
+        termina e só esse frame é devolvido.
+
+        Returns:
+            (bytes, formato)
+        """
+        max_bytes = max_bytes or self.image_max_bytes
+        async with self.get(url) as response:
+            if response.status != 200:
+                raise ImageFetchError(f"HTTP {response.status}")
+
+            length = response.content_length
+            buffer = bytearray()
+            image_format = None
+
+            async for chunk in response.content.iter_chunked(chunk_size):
+                buffer += chunk
+
+                if image_format is None and len(buffer) >= 12:
+                    image_format = sniff_image_format(bytes(buffer[:12]))
+                    if image_format is None:
+                        raise ImageFetchError("não é uma imagem")
+                    if image_format != 'gif' and length and length > max_bytes:
+                        raise ImageFetchError("imagem grande demais")
+
+                if image_format == 'gif':
+                    end = gif_first_frame_end(buffer)
+                    if end is not None:
+                        del buffer[end:]
+                        buffer += b';'  # trailer: GIF de um frame só
+                        break
+
+                if len(buffer) > max_bytes:
+                    raise ImageFetchError("imagem grande demais")
+
+            if image_format is None:
+                image_format = sniff_image_format(bytes(buffer))
+                if image_format is None:
+                    raise ImageFetchError("não é uma imagem")
+
+            return bytes(buffer), image_format
+
+    async def close(self):
+        """Fecha a sessão e todas as conexões do pool"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -2,8 +2,13 @@
 import discord
 from discord.ext import commands
 import os
+import time
 import config
 from guild_config import MY_GUILD
+from http_client import HttpClient
+from cog_loader import CogLoader, current_rss_mb
+from command_sync import CommandSync
+from colors import ColorCache
 
 # Configurar intents
 intents = discord.Intents.all()
@@ -19,37 +24,59 @@ class Bot(commands.Bot):
             intents=intents,
             application_id=1301020872664023153
         )
+        self.http_client = HttpClient(
+            limit=config.HTTP_POOL_LIMIT,
+            limit_per_host=config.HTTP_LIMIT_PER_HOST,
+            dns_ttl=config.HTTP_DNS_TTL,
+            keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+            timeout=config.HTTP_TIMEOUT,
+            image_max_bytes=config.IMAGE_MAX_BYTES
+        )
+        # Cache das cores de avatar/imagem usado pelo /info e /enviar
+        self.color_cache = ColorCache(
+            maxsize=config.COLOR_CACHE_SIZE,
+            path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'color_cache.json')
+            if config.COLOR_CACHE_PERSIST else None
+        )
     
     async def setup_hook(self):
         print("bot zikaaaa")
-        
-        # Limpar comandos antigos
-        print("arrumando os comandos antigo aqui")
-        self.tree.clear_commands(guild=None)
-        self.tree.clear_commands(guild=MY_GUILD)
-        await self.tree.sync(guild=None)
-        print("limpei...")
 
+        # Sessão HTTP compartilhada pelos cogs
+        await self.http_client.start()
+        
         # Carregar cogs
         print("carregando cogs:")
-        cogs_folder = './cogs'
-        cogs_carregados = 0
-        cogs_falhados = 0
-        
-        for filename in os.listdir(cogs_folder):
-            if filename.endswith('.py') and not filename.startswith('__'):
-                cog_name = filename[:-3]
-                try:
-                    await self.load_extension(f'cogs.{cog_name}')
-                    print(f"✓ {cog_name}")
-                    cogs_carregados += 1
-                except Exception as e:
-                    print(f"✗ {cog_name}: {str(e)}")
-                    cogs_falhados += 1
+        started = time.perf_counter()
+        rss_before = current_rss_mb()
+        loader = CogLoader(
+            self,
+            folder=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cogs'),
+            enabled=config.COGS_ENABLED,
+            disabled=config.COGS_DISABLED,
+            parallel=config.COGS_PARALLEL
+        )
+        reports = await loader.load_all()
+        for report in reports:
+            print(report)
+        cogs_carregados = sum(1 for report in reports if report.ok)
+        cogs_falhados = len(reports) - cogs_carregados
+
+        total = f"{(time.perf_counter() - started) * 1000:.0f}ms"
+        rss_after = current_rss_mb()
+        if rss_before is not None and rss_after is not None:
+            total += f", +{rss_after - rss_before:.1f}MB RSS"
+        print(f"cogs carregados em {total}")
+        if config.COGS_PARALLEL:
+            print("(RSS de cada cog só aparece com COGS_PARALLEL=0)")
 
-        # Sincronizar comandos
-        print("botando comandos novos")
-        await self.tree.sync(guild=MY_GUILD)
+        # Sincronizar comandos só nos escopos que mudaram desde o último boot
+        print("conferindo comandos")
+        command_sync = CommandSync(
+            self.tree,
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'command_tree.json')
+        )
+        await command_sync.sync([None, MY_GUILD], force=config.COMMANDS_FORCE_SYNC)
         
         # Resumo
         print(f"\nTERMINEI")
@@ -57,6 +84,10 @@ class Bot(commands.Bot):
         print(f"cogs com erro: {cogs_falhados}")
         print("-----------------")
     
+    async def close(self):
+        await super().close()
+        await self.http_client.close()
+
     async def on_ready(self):
         print(f'Bot conectado como: {self.user} (ID: {self.user.id})')
         
@@ -0,0 +1,129 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+
+def write_atomic(path: Path, data: Union[str, bytes]):
+    """Grava o arquivo inteiro de uma vez: escreve num temporário ao lado e
+    troca com os.replace, então quem lê nunca pega um arquivo pela metade"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    if isinstance(data, bytes):
+        tmp_path.write_bytes(data)
+    else:
+        tmp_path.write_text(data, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def write_json_atomic(path: Path, data: Any, **dump_kwargs):
+    """write_atomic com json.dumps; `dump_kwargs` vão direto pro dumps"""
+    write_atomic(path, json.dumps(data, **dump_kwargs))
+
+
+class JsonlStore:
+    """Histórico append-only em JSON Lines (uma entrada JSON por linha).
+
+    Cada append escreve só a linha nova, então o custo não cresce com o
+    tamanho do histórico. As escritas rodam numa thread pra não travar o
+    event loop. Quando o arquivo passa de `max_bytes` ele é rotacionado para
+    um segmento com timestamp no nome (comprimido com gzip se
+    `compress_rotated`), e só os `max_segments` mais recentes são mantidos
+    (None = mantém todos, histórico ilimitado).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        legacy_path: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+        max_segments: Optional[int] = None,
+        compress_rotated: bool = True
+    ):
+        self.path = Path(path)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self.max_bytes = max_bytes
+        self.max_segments = max_segments
+        self.compress_rotated = compress_rotated
+        self._lock = asyncio.Lock()
+
+        self.path.parent.mkdir(exist_ok=True)
+        self.migrate_legacy()
+
+    def migrate_legacy(self):
+        """Importa uma única vez o arquivo antigo (lista JSON) para o JSONL"""
+        if not self.legacy_path or not self.legacy_path.exists():
+            return
+
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            entries = json.loads(content) if content.strip() else []
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Error reading legacy history {self.legacy_path.name}: {e}")
+            return
+
+        if entries:
+            # As entradas antigas vêm antes de qualquer coisa já gravada no JSONL
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(self._encode(entry))
+                if self.path.exists():
+                    with open(self.path, 'r', encoding='utf-8') as current:
+                        shutil.copyfileobj(current, f)
+            os.replace(tmp_path, self.path)
+            print(f"Imported {len(entries)} entries from {self.legacy_path.name}")
+
+        self.legacy_path.rename(self.legacy_path.with_suffix(self.legacy_path.suffix + '.migrated'))
+
+    @staticmethod
+    def _encode(entry: dict) -> str:
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+
+    async def append(self, entry: dict):
+        async with self._lock:
+            await asyncio.to_thread(self._append, entry)
+
+    def _append(self, entry: dict):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(self._encode(entry))
+            size = f.tell()
+
+        if self.max_bytes and size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        segment = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        os.replace(self.path, segment)
+
+        if self.compress_rotated:
+            with open(segment, 'rb') as src, gzip.open(f"{segment}.gz", 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            segment.unlink()
+
+        if self.max_segments is not None:
+            for old in self.segments()[:-self.max_segments or None]:
+                old.unlink()
+
+    def segments(self) -> list:
+        """Segmentos rotacionados, do mais antigo pro mais novo"""
+        pattern = f"{self.path.stem}.*{self.path.suffix}*"
+        return sorted(p for p in self.path.parent.glob(pattern) if p != self.path)
+
+    def iter_entries(self) -> Iterator[dict]:
+        """Lê o histórico completo, incluindo segmentos rotacionados"""
+        for file in [*self.segments(), self.path]:
+            if not file.exists():
+                continue
+            opener = gzip.open if file.suffix == '.gz' else open
+            with opener(file, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
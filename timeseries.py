@@ -0,0 +1,194 @@
+import asyncio
+import json
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from storage import write_json_atomic
+
+
+class PriceSeries:
+    """Ring buffer de preços de um símbolo.
+
+    Timestamps são inteiros (epoch em segundos) guardados num array('q') e os
+    preços num array('d'), então retenção e dedup são só contas com inteiros.
+    """
+
+    def __init__(self, capacity: int = 25, retention: int = 24 * 3600, bucket: int = 60):
+        self.capacity = capacity
+        self.retention = retention
+        self.bucket = bucket
+        self.timestamps = array('q', [0] * capacity)
+        self.prices = array('d', [0.0] * capacity)
+        self.start = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _index(self, i: int) -> int:
+        return (self.start + i) % self.capacity
+
+    def append(self, timestamp: int, price: float):
+        # Uma entrada por bucket (minuto): se cair no mesmo, substitui a última
+        if self.count:
+            last = self._index(self.count - 1)
+            if self.timestamps[last] // self.bucket == timestamp // self.bucket:
+                self.timestamps[last] = timestamp
+                self.prices[last] = price
+                return
+
+        if self.count < self.capacity:
+            pos = self._index(self.count)
+            self.count += 1
+        else:
+            # Cheio: sobrescreve a mais antiga
+            pos = self.start
+            self.start = self._index(1)
+
+        self.timestamps[pos] = timestamp
+        self.prices[pos] = price
+
+    def prune(self, now: int):
+        cutoff = now - self.retention
+        while self.count and self.timestamps[self.start] < cutoff:
+            self.start = self._index(1)
+            self.count -= 1
+
+    def items(self) -> List[Tuple[int, float]]:
+        """Pares (timestamp, preço) do mais antigo pro mais recente"""
+        return [
+            (self.timestamps[self._index(i)], self.prices[self._index(i)])
+            for i in range(self.count)
+        ]
+
+    def latest(self) -> Optional[Tuple[int, float]]:
+        if not self.count:
+            return None
+        last = self._index(self.count - 1)
+        return self.timestamps[last], self.prices[last]
+
+
+class PriceStore:
+    """Séries de preço por símbolo, persistidas com uma única escrita por tick"""
+
+    def __init__(self, path: Path, capacity: int = 25, retention: int = 24 * 3600):
+        self.path = Path(path)
+        self.capacity = capacity
+        self.retention = retention
+        self.series: Dict[str, PriceSeries] = {}
+        self._lock = asyncio.Lock()
+
+    def _series(self, symbol: str) -> PriceSeries:
+        series = self.series.get(symbol)
+        if series is None:
+            series = self.series[symbol] = PriceSeries(self.capacity, self.retention)
+        return series
+
+    def add(self, symbol: str, price: float, timestamp: Optional[int] = None):
+        timestamp = int(time.time()) if timestamp is None else timestamp
+        series = self._series(symbol)
+        series.append(timestamp, price)
+        series.prune(timestamp)
+
+    def load(self):
+        """Carrega do disco; converte uma vez o formato antigo {"prices": [...]}"""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Error loading price data: {e}")
+            return
+
+        if not isinstance(data, dict):
+            return
+
+        if 'series' in data:
+            for symbol, values in data['series'].items():
+                series = self._series(symbol)
+                for timestamp, price in zip(values['t'], values['p']):
+                    series.append(int(timestamp), float(price))
+        elif 'prices' in data:
+            legacy = sorted(
+                (int(datetime.fromisoformat(p['timestamp']).timestamp()), p['symbol'], float(p['price']))
+                for p in data['prices']
+            )
+            for timestamp, symbol, price in legacy:
+                self._series(symbol).append(timestamp, price)
+
+        now = int(time.time())
+        for series in self.series.values():
+            series.prune(now)
+
+    def _snapshot(self) -> dict:
+        series = {}
+        for symbol, values in self.series.items():
+            items = values.items()
+            series[symbol] = {
+                't': [t for t, _ in items],
+                'p': [p for _, p in items]
+            }
+        return {'version': 2, 'series': series}
+
+    async def flush(self):
+        """Grava todas as séries de uma vez, fora do event loop"""
+        async with self._lock:
+            await asyncio.to_thread(write_json_atomic, self.path, self._snapshot(), separators=(',', ':'))
+
+
+class KlineCache:
+    """Cache de candles por símbolo, em memória e no disco.
+
+    Cada candle é [open_time_ms, close, high, low, volume], ordenado por
+    open_time. Só os `max_candles` mais recentes são mantidos.
+    """
+
+    def __init__(self, path: Path, max_candles: int = 720):
+        self.path = Path(path)
+        self.max_candles = max_candles
+        self.candles: Dict[str, List[list]] = {}
+        self._lock = asyncio.Lock()
+
+    def last_open_time(self, symbol: str) -> Optional[int]:
+        candles = self.candles.get(symbol)
+        return candles[-1][0] if candles else None
+
+    def merge(self, symbol: str, rows: List[list]):
+        """Junta candles novos; o último candle guardado pode ter mudado (ainda estava aberto)"""
+        if not rows:
+            return
+
+        candles = self.candles.setdefault(symbol, [])
+        first_new = rows[0][0]
+        while candles and candles[-1][0] >= first_new:
+            candles.pop()
+        candles.extend(rows)
+        del candles[:-self.max_candles]
+
+    def replace(self, symbol: str, rows: List[list]):
+        self.candles[symbol] = rows[-self.max_candles:]
+
+    def window(self, symbol: str, count: int) -> List[list]:
+        return self.candles.get(symbol, [])[-count:]
+
+    def load(self):
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for symbol, rows in data.get('candles', {}).items():
+                self.candles[symbol] = rows[-self.max_candles:]
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            print(f"Error loading kline cache: {e}")
+
+    async def flush(self):
+        async with self._lock:
+            snapshot = {'candles': {symbol: list(rows) for symbol, rows in self.candles.items()}}
+            await asyncio.to_thread(write_json_atomic, self.path, snapshot, separators=(',', ':'))